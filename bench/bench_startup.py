@@ -0,0 +1,55 @@
+# startup budget of parse.py: runs the CLI commands in fresh interpreters and fails if the median wall time of any
+# of them exceeds its budget (also enforced by tests/test_startup.py)
+# usage: python bench/bench_startup.py [trace path] [-b BUDGET] [-r RUNS]
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PARSE_PY = os.path.join(ROOT, "parse.py")
+# synthetic kernel trace (metadata and packet indexes, no userspace trace), so info runs without babeltrace
+FIXTURE_TRACE = os.path.join(ROOT, "tests", "fixtures", "tiny_trace")
+DEFAULT_BUDGET = 0.5 # s
+
+# median wall time (s) of running parse.py with args
+def time_command(args: list[str], runs: int) -> float:
+  durations: list[float] = []
+  for _ in range(runs):
+    start = time.perf_counter()
+    subprocess.run([ sys.executable, PARSE_PY, *args ], stdout=subprocess.DEVNULL, check=True)
+    durations.append(time.perf_counter() - start)
+  return statistics.median(durations)
+
+# median wall time (s) of each benchmarked command as (name, duration)
+#   trace: small trace to also time info (with and without counting tasksets, which loads babeltrace) and a full parse on
+#     (info is always timed on FIXTURE_TRACE)
+def startup_times(trace: str | None, runs: int) -> list[tuple[str, float]]:
+  with tempfile.TemporaryDirectory() as output_path:
+    commands = [ ("help", [ "-h" ]), ("info fixture", [ "info", FIXTURE_TRACE, "-o", output_path ]) ]
+    if trace is not None:
+      commands.append(("info", [ "info", trace, "--no-tasksets" ]))
+      commands.append(("info+tasksets", [ "info", trace ]))
+      commands.append(("parse", [ trace, "-o", output_path, "--no-cache" ]))
+    return [ (name, time_command(command, runs)) for name, command in commands ]
+
+def main() -> int:
+  parser = argparse.ArgumentParser(description="Measure the startup time of parse.py against a budget")
+  parser.add_argument("trace", nargs="?", help="small trace (directory or archive) to also time info and a full parse on")
+  parser.add_argument("-b", "--budget", type=float, default=DEFAULT_BUDGET, help=f"budget (s) of the median wall time of each command (default: {DEFAULT_BUDGET})")
+  parser.add_argument("-r", "--runs", type=int, default=5, help="runs per command (default: 5)")
+  args = parser.parse_args()
+
+  over_budget = False
+  for name, duration in startup_times(args.trace, args.runs):
+    over_budget = over_budget or duration > args.budget
+    print(f"{name.ljust(14)} {'{:.3f}'.format(duration)} s{'  OVER BUDGET' if duration > args.budget else ''}")
+  print(f"budget: {args.budget} s per command")
+  return 1 if over_budget else 0
+
+if __name__ == "__main__":
+  sys.exit(main())
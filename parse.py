@@ -2,34 +2,86 @@
 
 import os
 import sys
+import time
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)) + "/src")
 
-from trace_imports import *
-from trace_event_parsers import parse_trace_event_message
-from task_tracker import TaskTracker
+from utils.args import parse_args
+from config import Config
 
-def extract_trace(path) -> TraceIterator:
-  return bt2.TraceCollectionMessageIterator(path)
+# each command imports what it needs, so e.g. info never loads numpy (nor babeltrace with --no-tasksets)
 
-def parse_trace(trace: TraceIterator):
-  tracker = TaskTracker()
+def info(args):
+  from trace_archive import is_trace_archive, extracted_trace
+  from trace_info import read_trace_info, count_tasksets, read_parse_benchmark, trace_info_str
 
-  for msg in trace:
-    if type(msg) is TraceEventMessage:
-      parse_trace_event_message(tracker, msg)
+  # archives only need their metadata and indexes, streams are replaced by sparse placeholders (so tasksets can't be counted)
+  with extracted_trace(args.path, placeholders=True) as path:
+    traces = read_trace_info(path)
+    tasksets = count_tasksets(traces) if args.count_tasksets and not is_trace_archive(args.path) else None
+    if is_trace_archive(args.path):
+      for trace in traces:
+        trace.path = os.path.join(args.path, os.path.relpath(trace.path, path))
+  bytes_per_sec, events_per_byte = read_parse_benchmark(args.output_path)
+  print(trace_info_str(traces, tasksets, bytes_per_sec, events_per_byte))
 
-  if not tracker.is_complete:
-    raise Exception("Last taskset never completed (likely missing tracepoints)")
-  
-  tracker.output()
+# returns the exit code (REGRESSION_EXIT_CODE if any metric regressed, errors raise and exit with 1)
+def compare(args) -> int:
+  from compare import REGRESSION_EXIT_CODE, load_run, excluded_tasksets, compare_runs, comparison_str
+
+  threshold = args.threshold / 100
+  a, b = load_run(args.a), load_run(args.b)
+  # the same tasksets as in the combined statistics of parse
+  excluded = None if args.min_quality is None else (excluded_tasksets(a, args.min_quality), excluded_tasksets(b, args.min_quality))
+  comparisons, only_a, only_b = compare_runs(a, b, args.percentiles, threshold, args.confidence, args.resamples, args.seed, args.metrics, args.min_quality)
+  print(comparison_str(comparisons, only_a, only_b, threshold, args.confidence, args.resamples, excluded))
+  return REGRESSION_EXIT_CODE if any(len(comparison.regressions) > 0 for comparison in comparisons) else 0
+
+def parse(args):
+  from trace_parser import track_trace
+  from output_writer import write_output
+  from result_cache import ParseResults, load_cached_results, save_cached_results
+  from trace_archive import extracted_trace
+  from trace_info import trace_size, write_parse_benchmark
+
+  config = Config.from_args(args)
+  if not os.path.isdir(config.output_path):
+    os.mkdir(config.output_path)
+  exporter = None
+  if args.sqlite is not None:
+    from sqlite_export import SqliteExporter
+    exporter = SqliteExporter(args.sqlite or os.path.join(config.output_path, "results.sqlite"))
+
+  # the exporter is closed (building its indexes) even if parsing fails, keeping the tasksets exported so far queryable
+  try:
+    # reuse the parsed results if only output stages changed
+    results = load_cached_results(args.path, config) if args.cache else None
+    if results is not None:
+      print(f"Using cached results from {config.output_path}")
+      if exporter is not None:
+        for taskset in results.tasksets:
+          exporter.export_taskset(taskset)
+    else:
+      with extracted_trace(args.path, config.scratch_dir, config.scratch_limit) as path:
+        start = time.perf_counter()
+        tracker = track_trace(path, config, None if exporter is None else [ exporter.export_taskset ])
+        write_parse_benchmark(config.output_path, trace_size(path), tracker.parsed_msgs, time.perf_counter() - start)
+      results = ParseResults(tracker.completed_tasksets, tracker.quarantined_tasksets)
+      if args.cache:
+        save_cached_results(args.path, config, results)
+  finally:
+    if exporter is not None:
+      exporter.close()
+  write_output(results.tasksets, results.quarantined_tasksets, config)
 
 def main():
-  parse_args()
-  trace = extract_trace(Args.path)
-  if not os.path.isdir(Args.output_path):
-    os.mkdir(Args.output_path)
-  parse_trace(trace)
+  args = parse_args()
+  if args.command == "info":
+    info(args)
+  elif args.command == "compare":
+    sys.exit(compare(args))
+  else:
+    parse(args)
 
 if __name__ == "__main__":
-  main()
\ No newline at end of file
+  main()
@@ -0,0 +1,33 @@
+# columnar numpy views of the blocks of a completed taskset, for vectorized analyses
+
+from task_model import *
+
+import numpy as np
+import weakref
+
+# represents the sfunc blocks of a taskset as parallel arrays (ordered by entry time)
+class SFuncArrays:
+  def __init__(self, blocks: list[SFuncBlock]):
+    name_ids: dict[str, int] = {}
+    block_ids = dict((id(block), i) for i, block in enumerate(blocks))
+    n = len(blocks)
+    self.name_ids = np.fromiter((name_ids.setdefault(block.name, len(name_ids)) for block in blocks), dtype=np.int32, count=n)
+    self.names = list(name_ids.keys()) # name id -> name
+    self.cpu_ids = np.fromiter((block.cpu_id for block in blocks), dtype=np.int32, count=n)
+    self.nesting = np.fromiter((block.nesting for block in blocks), dtype=np.int32, count=n)
+    self.entry_times = np.fromiter((block.entry_time for block in blocks), dtype=np.int64, count=n)
+    self.exit_times = np.fromiter((block.exit_time for block in blocks), dtype=np.int64, count=n)
+    # index of the parent block (-1 if outermost or the parent is not part of the taskset)
+    self.parents = np.fromiter((-1 if block.parent is None else block_ids.get(id(block.parent), -1) for block in blocks), dtype=np.int64, count=n)
+    self.durations = self.exit_times - self.entry_times
+
+  def __len__(self):
+    return len(self.durations)
+
+_sfunc_arrays: "weakref.WeakKeyDictionary[CompletedTaskset, SFuncArrays]" = weakref.WeakKeyDictionary()
+
+# sfunc arrays of a taskset (built once per taskset)
+def sfunc_arrays(taskset: CompletedTaskset) -> SFuncArrays:
+  if taskset not in _sfunc_arrays:
+    _sfunc_arrays[taskset] = SFuncArrays(taskset.sfunc_blocks)
+  return _sfunc_arrays[taskset]
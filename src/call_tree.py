@@ -0,0 +1,168 @@
+# inclusive/exclusive time of scheduler functions per call path, with collapsed-stack (flame graph) output
+# and correction of the tracing probe effect: each sfunc entry/exit tracepoint adds a cost o to the blocks enclosing it,
+# so a block with D nested blocks and C direct children measures o * (1 + 2D) too much inclusive and o * (1 + C) exclusive time
+
+from task_model import *
+from block_arrays import SFuncArrays, sfunc_arrays
+from sched_profiles import PROFILES_BY_FUNC
+
+import numpy as np
+
+# root frame of a call path, grouping flame graphs by scheduler class
+def sched_class_name(sfunc: str) -> str:
+  return PROFILES_BY_FUNC[sfunc].name if sfunc in PROFILES_BY_FUNC else "other"
+
+PROBE_LEAF_PERCENTILE = 1 # percentile of a leaf function's durations taken as its fastest path
+PROBE_MIN_LEAF_SAMPLES = 20 # leaf functions with fewer blocks are not used to estimate the probe overhead
+
+# number of direct children and of all descendants of each block
+def nested_counts(arrays: SFuncArrays) -> tuple[np.ndarray, np.ndarray]:
+  n = len(arrays)
+  has_parent = arrays.parents >= 0
+  children = np.bincount(arrays.parents[has_parent], minlength=n).astype(np.int64)
+  descendants = np.zeros(n, dtype=np.int64)
+  # deepest level first, so the descendants of a block are complete before it is added to its parent
+  for level in np.unique(arrays.nesting)[::-1]:
+    idx = np.nonzero((arrays.nesting == level) & has_parent)[0]
+    np.add.at(descendants, arrays.parents[idx], 1 + descendants[idx])
+  return children, descendants
+
+# represents the estimated cost of a single sfunc tracepoint
+class ProbeOverhead:
+  def __init__(self, overhead: float, source: str):
+    self.overhead = overhead # ns per tracepoint
+    self.source = source # how it was obtained
+
+  # estimate from the shortest durations of leaf functions: a leaf block measures its own work plus one
+  # tracepoint, so the fastest path of the cheapest leaf function bounds the tracepoint cost
+  @staticmethod
+  def estimate(arrays_list: list[SFuncArrays], source: str) -> "ProbeOverhead | None":
+    leaf_durations: dict[str, list[np.ndarray]] = {}
+    for arrays in arrays_list:
+      children, _ = nested_counts(arrays)
+      leaves = children == 0
+      for name_id, name in enumerate(arrays.names):
+        leaf_durations.setdefault(name, []).append(arrays.durations[leaves & (arrays.name_ids == name_id)])
+    estimates: list[tuple[float, str]] = []
+    for name, durations in leaf_durations.items():
+      durations = np.concatenate(durations)
+      if len(durations) >= PROBE_MIN_LEAF_SAMPLES:
+        estimates.append((float(np.percentile(durations, PROBE_LEAF_PERCENTILE)), name))
+    if len(estimates) == 0:
+      return None
+    overhead, name = min(estimates)
+    return ProbeOverhead(overhead, f"p{PROBE_LEAF_PERCENTILE} of the leaf {name} blocks of {source}")
+
+# represents the aggregated call tree of a set of sfunc blocks
+class CallTreeProfile:
+  def __init__(self, paths: list[tuple[str, ...]], calls: np.ndarray, inclusive: np.ndarray, exclusive: np.ndarray, children: np.ndarray, descendants: np.ndarray):
+    self.paths = paths # call path (outermost function first) per path id
+    self.calls = calls # number of calls per path id
+    self.inclusive = inclusive # total inclusive time (ns) per path id
+    self.exclusive = exclusive # total exclusive (self) time (ns) per path id
+    self.children = children # total direct children per path id
+    self.descendants = descendants # total nested blocks per path id (each adding 2 tracepoints)
+
+  # inclusive and exclusive time per path id with the probe overhead removed (clipped at 0)
+  def corrected(self, probe: ProbeOverhead) -> tuple[np.ndarray, np.ndarray]:
+    inclusive = self.inclusive - probe.overhead * (self.calls + 2 * self.descendants)
+    exclusive = self.exclusive - probe.overhead * (self.calls + self.children)
+    return np.maximum(inclusive, 0), np.maximum(exclusive, 0)
+
+  @staticmethod
+  def from_arrays(arrays: SFuncArrays) -> "CallTreeProfile":
+    n = len(arrays)
+    durations = arrays.durations
+    has_parent = arrays.parents >= 0
+
+    # exclusive time: duration minus the durations of direct children
+    child_time = np.bincount(arrays.parents[has_parent], weights=durations[has_parent], minlength=n)
+    exclusive = durations - child_time.astype(np.int64)
+    children, descendants = nested_counts(arrays)
+
+    # assign call path ids level by level (a parent is always one nesting level above its children)
+    n_names = len(arrays.names)
+    block_paths = np.full(n, -1, dtype=np.int64)
+    path_parents = np.zeros(0, dtype=np.int64) # path id -> parent path id (-1 if root)
+    path_names = np.zeros(0, dtype=np.int64) # path id -> name id
+    for level in np.unique(arrays.nesting):
+      idx = np.nonzero(arrays.nesting == level)[0]
+      parents = arrays.parents[idx]
+      parent_paths = np.where(parents >= 0, block_paths[np.maximum(parents, 0)], -1)
+      keys = (parent_paths + 1) * n_names + arrays.name_ids[idx]
+      unique_keys, inverse = np.unique(keys, return_inverse=True)
+      block_paths[idx] = len(path_parents) + inverse.reshape(-1)
+      path_parents = np.concatenate([ path_parents, unique_keys // n_names - 1 ])
+      path_names = np.concatenate([ path_names, unique_keys % n_names ])
+
+    # the same path can be assigned at several levels if parents are missing, so dedupe by path tuple
+    paths: list[tuple[str, ...]] = []
+    for path_id in range(len(path_parents)):
+      name = arrays.names[path_names[path_id]]
+      parent = path_parents[path_id]
+      paths.append((*paths[parent], name) if parent >= 0 else (sched_class_name(name), name))
+    path_ids: dict[tuple[str, ...], int] = {}
+    remap = np.fromiter((path_ids.setdefault(path, len(path_ids)) for path in paths), dtype=np.int64, count=len(paths))
+    block_paths = remap[block_paths] if n > 0 else block_paths
+
+    n_paths = len(path_ids)
+    return CallTreeProfile(
+      list(path_ids.keys()),
+      np.bincount(block_paths, minlength=n_paths).astype(np.int64),
+      np.bincount(block_paths, weights=durations, minlength=n_paths).astype(np.int64),
+      np.bincount(block_paths, weights=exclusive, minlength=n_paths).astype(np.int64),
+      np.bincount(block_paths, weights=children, minlength=n_paths).astype(np.int64),
+      np.bincount(block_paths, weights=descendants, minlength=n_paths).astype(np.int64)
+    )
+
+  @staticmethod
+  def from_taskset(taskset: CompletedTaskset) -> "CallTreeProfile":
+    return CallTreeProfile.from_arrays(sfunc_arrays(taskset))
+
+  # combine the profiles of multiple tasksets by call path
+  @staticmethod
+  def combine(profiles: list["CallTreeProfile"]) -> "CallTreeProfile":
+    path_ids: dict[tuple[str, ...], int] = {}
+    for profile in profiles:
+      for path in profile.paths:
+        path_ids.setdefault(path, len(path_ids))
+    calls = np.zeros(len(path_ids), dtype=np.int64)
+    inclusive = np.zeros(len(path_ids), dtype=np.int64)
+    exclusive = np.zeros(len(path_ids), dtype=np.int64)
+    children = np.zeros(len(path_ids), dtype=np.int64)
+    descendants = np.zeros(len(path_ids), dtype=np.int64)
+    for profile in profiles:
+      idx = np.fromiter((path_ids[path] for path in profile.paths), dtype=np.int64, count=len(profile.paths))
+      np.add.at(calls, idx, profile.calls)
+      np.add.at(inclusive, idx, profile.inclusive)
+      np.add.at(exclusive, idx, profile.exclusive)
+      np.add.at(children, idx, profile.children)
+      np.add.at(descendants, idx, profile.descendants)
+    return CallTreeProfile(list(path_ids.keys()), calls, inclusive, exclusive, children, descendants)
+
+  # collapsed stacks ("frame;frame;frame value") weighted by exclusive time, as read by flame graph tools
+  def collapsed_str(self) -> str:
+    return "\n".join(f"{';'.join(path)} {self.exclusive[i]}" for i, path in enumerate(self.paths) if self.exclusive[i] > 0)
+
+  # probe: if given, adds the overhead-corrected times and how much of the measured time is tracing overhead
+  def table_str(self, probe: ProbeOverhead | None = None) -> str:
+    res: list[str] = []
+    res.append("CALL TREE (ordered by exclusive time)")
+    if probe is not None:
+      inclusive, exclusive = self.corrected(probe)
+      roots = np.array([ len(path) == 2 for path in self.paths ], dtype=bool)
+      measured = int(self.inclusive[roots].sum()) if len(self.paths) > 0 else 0
+      real = float(inclusive[roots].sum()) if len(self.paths) > 0 else 0.0
+      res.append(f"probe overhead: {'{:.1f}'.format(probe.overhead)} ns per tracepoint ({probe.source})")
+      res.append(f"measured scheduler time: {measured} ns, of which tracing overhead: {'{:.0f}'.format(measured - real)} ns ({'{:.1f}'.format(100 * (measured - real) / max(measured, 1))}%)")
+      res.append("")
+      res.append("               calls   nested tp      inclusive (ns)      exclusive (ns)   mean excl. (ns)  corr. incl. (ns)  corr. excl. (ns)  corr. mean excl. (ns)  path")
+    else:
+      res.append("               calls   nested tp      inclusive (ns)      exclusive (ns)   mean excl. (ns)  path")
+    for i in np.argsort(-self.exclusive, kind="stable"):
+      mean_exclusive = self.exclusive[i] / max(self.calls[i], 1)
+      row = f" - {str(self.calls[i]).rjust(17)}{str(2 * self.descendants[i]).rjust(12)}{str(self.inclusive[i]).rjust(20)}{str(self.exclusive[i]).rjust(20)}{'{:.3f}'.format(mean_exclusive).rjust(18)}"
+      if probe is not None:
+        row += f"{'{:.0f}'.format(inclusive[i]).rjust(18)}{'{:.0f}'.format(exclusive[i]).rjust(18)}{'{:.3f}'.format(exclusive[i] / max(self.calls[i], 1)).rjust(23)}"
+      res.append(f"{row}  {';'.join(self.paths[i])}")
+    return "\n".join(res)
@@ -0,0 +1,161 @@
+# compare the metrics of two parsed runs (e.g. two kernels or scheduler classes)
+# percentile deltas get bootstrap confidence intervals and each metric gets a rank-sum test
+# all metrics are durations or counts where lower is better
+
+from result_cache import CACHE_FILE, PARSER_VERSION, ParseResults, read_cache_file
+from data_quality import meets_min_quality
+
+import math
+import os
+import re
+import numpy as np
+
+MIN_SAMPLES = 10 # fewer samples on either side are reported but never flagged
+# exit code of the compare command on significant regressions, distinct from errors (1) and usage errors (2, argparse)
+REGRESSION_EXIT_CODE = 3
+BOOTSTRAP_CHUNK_ELEMENTS = 1 << 22 # bounds the memory of vectorized resampling
+
+# load the parsed results of a run from its output directory (or its parse cache file)
+def load_run(path: str) -> ParseResults:
+  file_path = os.path.join(path, CACHE_FILE) if os.path.isdir(path) else path
+  if not os.path.isfile(file_path):
+    raise Exception(f"No parsed results found at {file_path} (parse the trace with --cache first)")
+  header, results = read_cache_file(file_path)
+  if results is None:
+    raise Exception(f"{file_path} was parsed by parser version {header.parser_version} (current: {PARSER_VERSION}), parse the trace again")
+  return results
+
+# ids of the tasksets of a run below the minimum data quality score, which parse leaves out of the combined statistics
+def excluded_tasksets(results: ParseResults, min_quality: float | None) -> list[int]:
+  return [ taskset.taskset_id for taskset in results.tasksets if not meets_min_quality(taskset.quality, min_quality) ]
+
+# samples of every metric over the tasksets of a run meeting the minimum data quality score (None to keep all)
+def run_metrics(results: ParseResults, min_quality: float | None = None) -> dict[str, np.ndarray]:
+  samples: dict[str, list[int]] = {}
+  for taskset in results.tasksets:
+    if not meets_min_quality(taskset.quality, min_quality):
+      continue
+    for name, data in taskset.exec_data.items():
+      samples.setdefault(name, []).extend(data.durations)
+  return dict((name, np.array(values)) for name, values in samples.items())
+
+# percentiles as the smallest value whose cumulative count reaches the rank (inverted cdf)
+# computed on (values, counts) so resamples only need new counts
+def weighted_percentiles(values: np.ndarray, cum_counts: np.ndarray, ranks: np.ndarray) -> np.ndarray:
+  return values[(cum_counts[..., None] < ranks).sum(axis=-2)]
+
+def percentile_ranks(n: int, percentiles: list[float]) -> np.ndarray:
+  return np.maximum(np.ceil(np.array(percentiles) / 100 * n), 1).astype(np.int64)
+
+def sample_percentiles(samples: np.ndarray, percentiles: list[float]) -> np.ndarray:
+  values, counts = np.unique(samples, return_counts=True)
+  return weighted_percentiles(values, np.cumsum(counts), percentile_ranks(len(samples), percentiles))
+
+# bootstrap distribution of percentiles, shape (resamples, percentiles)
+# a resample with replacement is a multinomial draw over the distinct values, so the cost scales with
+# the number of distinct values instead of the number of samples
+def bootstrap_percentiles(samples: np.ndarray, percentiles: list[float], resamples: int, rng: np.random.Generator) -> np.ndarray:
+  values, counts = np.unique(samples, return_counts=True)
+  n = len(samples)
+  ranks = percentile_ranks(n, percentiles)
+  res = np.empty((resamples, len(percentiles)), dtype=values.dtype)
+  chunk = max(1, BOOTSTRAP_CHUNK_ELEMENTS // len(values))
+  for start in range(0, resamples, chunk):
+    size = min(chunk, resamples - start)
+    cum_counts = np.cumsum(rng.multinomial(n, counts / n, size=size), axis=1)
+    res[start:start + size] = weighted_percentiles(values, cum_counts, ranks)
+  return res
+
+# two-sided Mann-Whitney rank-sum test (normal approximation with tie correction): (z, p)
+# z > 0 means b tends to be larger than a
+def rank_sum_test(a: np.ndarray, b: np.ndarray) -> tuple[float, float]:
+  n_a, n_b = len(a), len(b)
+  n = n_a + n_b
+  _, inverse, counts = np.unique(np.concatenate([ a, b ]), return_inverse=True, return_counts=True)
+  average_ranks = np.cumsum(counts) - (counts - 1) / 2
+  u = average_ranks[inverse[n_a:]].sum() - n_b * (n_b + 1) / 2
+  ties = float((counts.astype(np.float64) ** 3 - counts).sum())
+  variance = n_a * n_b / 12 * ((n + 1) - ties / (n * (n - 1)))
+  if variance <= 0:
+    return 0.0, 1.0
+  z = (u - n_a * n_b / 2) / math.sqrt(variance)
+  return z, math.erfc(abs(z) / math.sqrt(2))
+
+# represents the comparison of a single percentile of a metric
+class PercentileDelta:
+  def __init__(self, percentile: float, a: float, b: float, ci_low: float, ci_high: float, threshold: float):
+    self.percentile = percentile
+    self.a = a
+    self.b = b
+    self.delta = b - a
+    self.relative = None if a == 0 else self.delta / abs(a)
+    self.ci_low = ci_low
+    self.ci_high = ci_high
+    # flagged only if the change is above the threshold and its confidence interval excludes 0
+    self.regression = (self.relative is None or self.relative > threshold) and self.delta > 0 and ci_low > 0
+    self.improvement = (self.relative is None or self.relative < -threshold) and self.delta < 0 and ci_high < 0
+
+# represents the comparison of a metric between two runs
+class MetricComparison:
+  def __init__(self, name: str, a: np.ndarray, b: np.ndarray, percentiles: list[float], threshold: float, confidence: float, resamples: int, rng: np.random.Generator):
+    self.name = name
+    self.count_a = len(a)
+    self.count_b = len(b)
+    self.deltas: list[PercentileDelta] = []
+    self.rank_sum: tuple[float, float] | None = None
+    if min(len(a), len(b)) < MIN_SAMPLES:
+      return
+
+    self.rank_sum = rank_sum_test(a, b)
+    point_a = sample_percentiles(a, percentiles)
+    point_b = sample_percentiles(b, percentiles)
+    boot_deltas = bootstrap_percentiles(b, percentiles, resamples, rng).astype(np.float64) - bootstrap_percentiles(a, percentiles, resamples, rng)
+    ci = np.percentile(boot_deltas, [ (1 - confidence) / 2 * 100, (1 + confidence) / 2 * 100 ], axis=0)
+    for i, percentile in enumerate(percentiles):
+      self.deltas.append(PercentileDelta(percentile, float(point_a[i]), float(point_b[i]), float(ci[0, i]), float(ci[1, i]), threshold))
+
+  @property
+  def regressions(self) -> list[PercentileDelta]:
+    return [ delta for delta in self.deltas if delta.regression ]
+
+def compare_runs(a: ParseResults, b: ParseResults, percentiles: list[float], threshold: float, confidence: float, resamples: int, seed: int, metric_pattern: str | None = None, min_quality: float | None = None) -> tuple[list[MetricComparison], list[str], list[str]]:
+  metrics_a = run_metrics(a, min_quality)
+  metrics_b = run_metrics(b, min_quality)
+  names = [ name for name in metrics_a if metric_pattern is None or re.search(metric_pattern, name) ]
+  rng = np.random.default_rng(seed)
+  comparisons = [ MetricComparison(name, metrics_a[name], metrics_b[name], percentiles, threshold, confidence, resamples, rng) for name in sorted(names) if name in metrics_b ]
+  only_a = sorted(name for name in names if name not in metrics_b)
+  only_b = sorted(name for name in metrics_b if name not in metrics_a and (metric_pattern is None or re.search(metric_pattern, name)))
+  return comparisons, only_a, only_b
+
+#   excluded: ids of the tasksets of A and B left out below the minimum data quality score (None if not filtered)
+def comparison_str(comparisons: list[MetricComparison], only_a: list[str], only_b: list[str], threshold: float, confidence: float, resamples: int, excluded: tuple[list[int], list[int]] | None = None) -> str:
+  res: list[str] = [ f"COMPARISON A -> B (regression threshold {'{:+.1f}'.format(threshold * 100)}%, {'{:.0f}'.format(confidence * 100)}% bootstrap CI over {resamples} resamples)" ]
+  if excluded is not None:
+    for name, ids in zip("AB", excluded):
+      res.append(f"tasksets of {name} below the minimum data quality: {len(ids)}" + ("" if len(ids) == 0 else f" ({', '.join(map(str, ids))})"))
+  def fmt(v: float):
+    return "{:.1f}".format(v)
+  for comparison in comparisons:
+    res.append("")
+    if comparison.rank_sum is None:
+      res.append(f" - {comparison.name} (n {comparison.count_a} -> {comparison.count_b}): too few samples")
+      continue
+    z, p = comparison.rank_sum
+    res.append(f" - {comparison.name} (n {comparison.count_a} -> {comparison.count_b}, rank-sum z={'{:.2f}'.format(z)} p={'{:.3g}'.format(p)})")
+    for delta in comparison.deltas:
+      relative = "" if delta.relative is None else f" ({'{:+.1f}'.format(delta.relative * 100)}%)"
+      verdict = "  REGRESSION" if delta.regression else "  improvement" if delta.improvement else ""
+      res.append(f"     p{'{:g}'.format(delta.percentile).ljust(5)}{fmt(delta.a).rjust(14)} -> {fmt(delta.b).ljust(10)}{'{:+.1f}'.format(delta.delta).rjust(14)}{relative.ljust(11)} CI [{'{:+.1f}'.format(delta.ci_low)}, {'{:+.1f}'.format(delta.ci_high)}]{verdict}")
+
+  if len(only_a) > 0:
+    res.append("")
+    res.append(f"only in A: {', '.join(only_a)}")
+  if len(only_b) > 0:
+    res.append("")
+    res.append(f"only in B: {', '.join(only_b)}")
+
+  regressed = [ comparison.name for comparison in comparisons if len(comparison.regressions) > 0 ]
+  res.append("")
+  res.append(f"regressions: {len(regressed)}" + ("" if len(regressed) == 0 else f" ({', '.join(regressed)})"))
+  return "\n".join(res)
@@ -0,0 +1,55 @@
+# parser configuration
+# each TaskTracker owns its own config, so several trackers can run in one interpreter
+
+import argparse
+
+# analyses whose outputs parse can write (their modules are only loaded if requested)
+ANALYSES = [ "timelines", "sfunc_profile", "job_report", "migration", "ready_queue", "anomalies" ]
+
+class Config:
+  def __init__(self, output_path: str = "./output", render: bool = False, verbose: bool = False, lenient: bool = False, progress: bool = True, exec_blocks: bool = False, overhead_bucket_ns: int = 1000000, outliers: int = 10, outlier_threshold: float = 8.0, scratch_dir: str | None = None, scratch_limit: int | None = None, probe_overhead_ns: float | None = None, probe_calibration_taskset: int | None = None, sched_classes: list[str] | None = None, min_quality: float | None = None, analyses: list[str] | None = None):
+    self.output_path = output_path # directory outputs are written to
+    self.render = render # render visualization of job executions
+    self.verbose = verbose # output debug logs
+    self.lenient = lenient # quarantine tasksets with tracking errors instead of aborting
+    self.progress = progress # display a progress line while parsing
+    self.exec_blocks = exec_blocks # keep the exec blocks of each job (implied by render)
+    self.overhead_bucket_ns = overhead_bucket_ns # bucket size of the scheduler overhead timelines
+    self.outliers = outliers # top anomalies kept per taskset (0 disables outlier detection)
+    self.outlier_threshold = outlier_threshold # robust z-score above which an occurrence is an outlier
+    self.scratch_dir = scratch_dir # where trace archives are extracted (None for the system temp directory)
+    self.scratch_limit = scratch_limit # maximum bytes extracted from a trace archive (None for no limit)
+    self.probe_overhead_ns = probe_overhead_ns # cost of a single sfunc tracepoint (None to estimate it)
+    self.probe_calibration_taskset = probe_calibration_taskset # taskset the probe overhead is estimated from (None for all)
+    self.sched_classes = sched_classes # scheduler class profiles to track (None to select them from the trace metadata)
+    self.min_quality = min_quality # tasksets with a lower data quality score are left out of the combined statistics (None to keep all)
+    self.analyses = analyses # analyses whose outputs are written (None for all of ANALYSES)
+
+  @property
+  def keep_exec_blocks(self) -> bool:
+    return self.render or self.exec_blocks
+
+  # whether the outputs of an analysis are written
+  def writes(self, analysis: str) -> bool:
+    return self.analyses is None or analysis in self.analyses
+
+  # build a config from the parsed command line arguments
+  @staticmethod
+  def from_args(args: argparse.Namespace) -> "Config":
+    return Config(
+      output_path = args.output_path,
+      render = bool(args.render),
+      verbose = bool(args.verbose),
+      lenient = bool(args.lenient),
+      exec_blocks = bool(args.exec_blocks) or args.sqlite is not None,
+      overhead_bucket_ns = args.overhead_bucket,
+      outliers = args.outliers,
+      outlier_threshold = args.outlier_threshold,
+      scratch_dir = args.scratch_dir,
+      scratch_limit = None if args.scratch_limit is None else round(args.scratch_limit * (1 << 30)),
+      probe_overhead_ns = args.probe_overhead,
+      probe_calibration_taskset = args.probe_calibration,
+      sched_classes = args.sched_class,
+      min_quality = args.min_quality,
+      analyses = None if args.analysis is None else [ analysis for analysis in args.analysis if analysis != "none" ]
+    )
@@ -0,0 +1,158 @@
+# accounting of the events lost by the tracer and of the event density per cpu, qualifying the results of each taskset
+# LTTng drops events when its ring buffers fill up (reported by babeltrace as discarded events/packets messages), which
+# silently skews the statistics of the tasksets they happen in
+
+from array import array
+
+from utils.pretty_time import time2str
+
+EVENT_RATE_BUCKET_NS = 1000000 # resolution of the per-cpu event rate timelines
+
+# events received and lost on a cpu
+class CPUEventCounts:
+  def __init__(self, cpu_id: int):
+    self.cpu_id = cpu_id
+    self.events = 0
+    self.packets = 0 # packets received (to estimate the events of lost packets)
+    self.lost_events = 0
+    self.lost_packets = 0
+    self.losses: list[tuple[int, int, int, int]] = [] # (begin time, end time, lost events, lost packets) as reported
+    # event rates are derived from the packets rather than from every event: the time each packet began, and the events
+    # received on the cpu before it (if kept)
+    self.packet_times = array("q")
+    self.packet_events = array("q")
+
+  # lost events, counting each lost packet as the mean number of events of the packets received
+  @property
+  def estimated_lost_events(self) -> float:
+    events_per_packet = self.events / self.packets if self.packets > 0 else 1
+    return self.lost_events + self.lost_packets * max(events_per_packet, 1)
+
+  # estimated fraction of the events that were received
+  @property
+  def score(self) -> float:
+    lost = self.estimated_lost_events
+    return self.events / (self.events + lost) if lost > 0 else 1.0
+
+  # events per bucket_ns from start_time to end_time, spreading the events received between two packets evenly over the
+  # time between them (so bursts within a packet are averaged out)
+  def rates(self, start_time: int, end_time: int, bucket_ns: int) -> array:
+    buckets = max(-(-(end_time - start_time) // bucket_ns), 1)
+    rates = array("d", bytes(8 * buckets))
+    times = [ start_time, *self.packet_times, end_time ]
+    events = [ 0, *self.packet_events, self.events ]
+    for i in range(len(times) - 1):
+      count = events[i + 1] - events[i]
+      time, span_end = times[i], times[i + 1]
+      if count == 0:
+        continue
+      if span_end <= time:
+        rates[min((time - start_time) // bucket_ns, buckets - 1)] += count
+        continue
+      density = count / (span_end - time)
+      while time < span_end:
+        bucket = min((time - start_time) // bucket_ns, buckets - 1)
+        edge = min(start_time + (bucket + 1) * bucket_ns, span_end)
+        rates[bucket] += (edge - time) * density
+        time = edge
+    return rates
+
+# represents the events received and lost per cpu over a window of the trace (a taskset, or the time between tasksets)
+class DataQuality:
+  def __init__(self, start_time: int, keep_rates: bool):
+    self.start_time = start_time
+    self.end_time = start_time
+    self.keep_rates = keep_rates # keep the per-cpu event rate timelines
+    self.cpus: dict[int, CPUEventCounts] = {} # cpu id -> counts
+
+  def get_cpu(self, cpu_id: int) -> CPUEventCounts:
+    counts = self.cpus.get(cpu_id)
+    if counts is None:
+      counts = self.cpus[cpu_id] = CPUEventCounts(cpu_id)
+    return counts
+
+  # called for every event, so kept to a counter increment
+  def record_event(self, cpu_id: int):
+    counts = self.cpus.get(cpu_id)
+    if counts is None:
+      counts = self.get_cpu(cpu_id)
+    counts.events += 1
+
+  def record_packet(self, cpu_id: int, time: int):
+    counts = self.get_cpu(cpu_id)
+    counts.packets += 1
+    if self.keep_rates:
+      counts.packet_times.append(max(time, self.start_time))
+      counts.packet_events.append(counts.events)
+
+  def record_discarded(self, cpu_id: int, lost_events: int, lost_packets: int, begin_time: int, end_time: int):
+    counts = self.get_cpu(cpu_id)
+    counts.lost_events += lost_events
+    counts.lost_packets += lost_packets
+    counts.losses.append((begin_time, end_time, lost_events, lost_packets))
+
+  @property
+  def events(self) -> int:
+    return sum(counts.events for counts in self.cpus.values())
+
+  @property
+  def lost_events(self) -> int:
+    return sum(counts.lost_events for counts in self.cpus.values())
+
+  @property
+  def lost_packets(self) -> int:
+    return sum(counts.lost_packets for counts in self.cpus.values())
+
+  # estimated fraction of the events of the window that were received (1.0 if nothing was lost)
+  @property
+  def score(self) -> float:
+    lost = sum(counts.estimated_lost_events for counts in self.cpus.values())
+    return self.events / (self.events + lost) if lost > 0 else 1.0
+
+  @property
+  def is_lossy(self) -> bool:
+    return self.lost_events > 0 or self.lost_packets > 0
+
+  def summary_str(self) -> str:
+    return f"DATA QUALITY: {'{:.4f}'.format(self.score)} ({self.events} events, {self.lost_events} lost events, {self.lost_packets} lost packets)"
+
+  def report_str(self) -> str:
+    span_ms = max(self.end_time - self.start_time, EVENT_RATE_BUCKET_NS) / 1000000 # at least a bucket, so mean <= peak
+    bucket_ms = EVENT_RATE_BUCKET_NS / 1000000
+    res: list[str] = [ self.summary_str() ]
+    res.append("")
+    res.append("PER CPU")
+    res.append("      cpu        events   packets   lost events  lost packets   mean rate (ev/ms)   peak rate (ev/ms)  quality")
+    for cpu_id, counts in sorted(self.cpus.items()):
+      peak = max(counts.rates(self.start_time, self.end_time, EVENT_RATE_BUCKET_NS)) / bucket_ms if self.keep_rates else 0
+      res.append(f" - {str(cpu_id).rjust(6)}{str(counts.events).rjust(14)}{str(counts.packets).rjust(10)}{str(counts.lost_events).rjust(14)}{str(counts.lost_packets).rjust(14)}{'{:.1f}'.format(counts.events / span_ms).rjust(20)}{'{:.1f}'.format(peak).rjust(20)}{'{:.4f}'.format(counts.score).rjust(9)}")
+
+    res.append("")
+    res.append(f"LOSSES ({sum(len(counts.losses) for counts in self.cpus.values())})")
+    for cpu_id, counts in sorted(self.cpus.items()):
+      for begin_time, end_time, lost_events, lost_packets in counts.losses:
+        res.append(f" - [{time2str(begin_time)} -> {time2str(end_time)}] cpu{cpu_id}: {lost_events} events, {lost_packets} packets")
+    return "\n".join(res)
+
+  # saves the per-cpu event rate timelines (cpu_ids, start_time, bucket_ns and rates: events per bucket, one row per cpu)
+  def save_rates(self, path: str):
+    import numpy as np
+    cpu_ids = sorted(self.cpus)
+    rates = [ self.cpus[cpu_id].rates(self.start_time, self.end_time, EVENT_RATE_BUCKET_NS) for cpu_id in cpu_ids ]
+    np.savez_compressed(path, cpu_ids=np.array(cpu_ids, dtype=np.int64), start_time=self.start_time, bucket_ns=EVENT_RATE_BUCKET_NS, rates=np.array(rates, dtype=np.float64).reshape(len(cpu_ids), -1))
+
+# whether a window meets the minimum data quality score (None to keep all)
+def meets_min_quality(quality: DataQuality, min_score: float | None) -> bool:
+  return min_score is None or quality.score >= min_score
+
+# scores of all tasksets, and which were left out of the combined statistics
+#   min_score: tasksets below it are excluded (None to keep all)
+def combined_quality_str(qualities: list[tuple[int, DataQuality]], min_score: float | None) -> str:
+  excluded = [ taskset_id for taskset_id, quality in qualities if not meets_min_quality(quality, min_score) ]
+  res: list[str] = [ f"DATA QUALITY ({len(qualities)} tasksets, {len(excluded)} excluded from combined statistics{'' if min_score is None else f' below {min_score}'})" ]
+  for taskset_id, quality in qualities:
+    res.append(f" - taskset {taskset_id}: {'{:.4f}'.format(quality.score)} ({quality.events} events, {quality.lost_events} lost events, {quality.lost_packets} lost packets){' EXCLUDED' if taskset_id in excluded else ''}")
+  lossy = [ taskset_id for taskset_id, quality in qualities if quality.is_lossy and taskset_id not in excluded ]
+  if len(lossy) > 0:
+    res.append(f"warning: lossy tasksets included in combined statistics: {', '.join(map(str, lossy))}")
+  return "\n".join(res)
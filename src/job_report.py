@@ -0,0 +1,102 @@
+# per-task response time, tardiness, deadline misses and execution time against wcet,
+# compared with utilization-based schedulability bounds of the taskset
+
+from task_model import *
+
+import numpy as np
+
+RESPONSE_PERCENTILES = [ 50, 90, 99 ]
+
+# represents the job columns of a taskset (aborted jobs excluded since they were cut short by the experiment end)
+class JobColumns:
+  def __init__(self, taskset: CompletedTaskset):
+    jobs = [ job for job in taskset.jobs if job.exit_status != CompletedJob.ExitStatus.ABORTED ]
+    n = len(jobs)
+    self.task_ids = np.fromiter((job.task_id for job in jobs), dtype=np.int64, count=n)
+    self.response_times = np.fromiter((job.response_time for job in jobs), dtype=np.int64, count=n)
+    self.tardiness = np.maximum(0, np.fromiter((job.completion_time - job.absolute_deadline for job in jobs), dtype=np.int64, count=n))
+    self.overrun = np.fromiter((job.exit_status == CompletedJob.ExitStatus.DEADLINE_OVERRUN for job in jobs), dtype=bool, count=n)
+    self.exec_times = np.fromiter((job.exec_time for job in jobs), dtype=np.int64, count=n)
+
+# represents the schedulability report of a taskset
+class JobReport:
+  def __init__(self, taskset: CompletedTaskset):
+    self.taskset_id = taskset.taskset_id
+    self.tasks = taskset.tasks
+    self.m = max(1, len(taskset.cpu_ids))
+    n_tasks = len(taskset.tasks)
+    columns = JobColumns(taskset)
+
+    # per-task aggregates
+    self.jobs = np.bincount(columns.task_ids, minlength=n_tasks)
+    self.missed = np.bincount(columns.task_ids, weights=(columns.tardiness > 0) | columns.overrun, minlength=n_tasks).astype(np.int64)
+    self.max_tardiness = np.zeros(n_tasks, dtype=np.int64)
+    np.maximum.at(self.max_tardiness, columns.task_ids, columns.tardiness)
+    self.total_tardiness = np.bincount(columns.task_ids, weights=columns.tardiness, minlength=n_tasks)
+    self.exec_sum = np.bincount(columns.task_ids, weights=columns.exec_times, minlength=n_tasks)
+    self.max_exec = np.zeros(n_tasks, dtype=np.int64)
+    np.maximum.at(self.max_exec, columns.task_ids, columns.exec_times)
+    self.response_percentiles = np.zeros((n_tasks, len(RESPONSE_PERCENTILES)))
+    self.max_response = np.zeros(n_tasks, dtype=np.int64)
+    order = np.argsort(columns.task_ids, kind="stable")
+    bounds = np.searchsorted(columns.task_ids[order], np.arange(n_tasks + 1))
+    for task_id in range(n_tasks):
+      response_times = columns.response_times[order[bounds[task_id]:bounds[task_id + 1]]]
+      if len(response_times) > 0:
+        self.response_percentiles[task_id] = np.percentile(response_times, RESPONSE_PERCENTILES)
+        self.max_response[task_id] = response_times.max()
+
+    # task parameters and utilization-based bounds
+    periods = np.array([ task.params.period for task in taskset.tasks ], dtype=np.float64)
+    deadlines = np.array([ task.params.deadline for task in taskset.tasks ], dtype=np.float64)
+    self.wcets = np.array([ task.params.wcet for task in taskset.tasks ], dtype=np.float64)
+    self.exceeded_wcet = np.bincount(columns.task_ids, weights=columns.exec_times > self.wcets[columns.task_ids] if n_tasks > 0 else [], minlength=n_tasks).astype(np.int64)
+    utilizations = self.wcets / periods if n_tasks > 0 else np.zeros(0)
+    densities = self.wcets / np.minimum(deadlines, periods) if n_tasks > 0 else np.zeros(0)
+    self.utilization = float(utilizations.sum())
+    self.density = float(densities.sum())
+    self.max_density = float(densities.max()) if n_tasks > 0 else 0.0
+    mean_exec = np.divide(self.exec_sum, self.jobs, out=np.zeros(n_tasks), where=self.jobs > 0)
+    self.observed_utilization = float((mean_exec / periods).sum()) if n_tasks > 0 else 0.0
+    # necessary condition for any scheduler
+    self.feasible = self.utilization <= self.m
+    # Goossens-Funk-Baruah density bound for global EDF (sufficient)
+    self.gfb_bound = self.m - (self.m - 1) * self.max_density
+    self.gfb_schedulable = self.density <= self.gfb_bound
+    self.miss_ratio = float(self.missed.sum() / self.jobs.sum()) if self.jobs.sum() > 0 else 0.0
+
+  def bounds_str(self) -> str:
+    res: list[str] = []
+    res.append(f"cpus: {self.m}")
+    res.append(f"utilization: {'{:.3f}'.format(self.utilization)} (observed: {'{:.3f}'.format(self.observed_utilization)}), density: {'{:.3f}'.format(self.density)}")
+    res.append(f"feasible (U <= m): {'yes' if self.feasible else 'no'}")
+    res.append(f"global EDF GFB bound (density <= m - (m-1)*max density = {'{:.3f}'.format(self.gfb_bound)}): {'schedulable' if self.gfb_schedulable else 'not guaranteed'}")
+    res.append(f"deadline miss ratio: {'{:.6f}'.format(self.miss_ratio)}")
+    return "\n".join(res)
+
+  def report_str(self) -> str:
+    res: list[str] = [ f"TASKSET {self.taskset_id}", self.bounds_str(), "" ]
+    percentile_names = "".join(f"p{p} resp".rjust(16) for p in RESPONSE_PERCENTILES)
+    res.append(f"                        task   jobs  missed  miss ratio{percentile_names}        max resp   max tardiness  total tardiness       wcet   mean exec    max exec  > wcet")
+    for task in self.tasks:
+      i = task.task_id
+      miss_ratio = self.missed[i] / self.jobs[i] if self.jobs[i] > 0 else 0.0
+      mean_exec = self.exec_sum[i] / self.jobs[i] if self.jobs[i] > 0 else 0.0
+      percentiles = "".join("{:.1f}".format(v).rjust(16) for v in self.response_percentiles[i])
+      res.append(
+        f" - {str(task).rjust(25)}{str(self.jobs[i]).rjust(7)}{str(self.missed[i]).rjust(8)}{'{:.4f}'.format(miss_ratio).rjust(12)}{percentiles}"
+        f"{str(self.max_response[i]).rjust(16)}{str(self.max_tardiness[i]).rjust(16)}{str(int(self.total_tardiness[i])).rjust(17)}"
+        f"{str(int(self.wcets[i])).rjust(11)}{'{:.1f}'.format(mean_exec).rjust(12)}{str(self.max_exec[i]).rjust(12)}{str(self.exceeded_wcet[i]).rjust(8)}"
+      )
+    return "\n".join(res)
+
+# one line per taskset, to spot the tasksets the scheduler handles badly
+def combined_job_report_str(reports: list[JobReport]) -> str:
+  res: list[str] = []
+  res.append("   taskset  cpus  utilization  observed util.     density   feasible  GFB schedulable   miss ratio")
+  for report in reports:
+    res.append(
+      f" - {str(report.taskset_id).rjust(7)}{str(report.m).rjust(6)}{'{:.3f}'.format(report.utilization).rjust(13)}{'{:.3f}'.format(report.observed_utilization).rjust(16)}"
+      f"{'{:.3f}'.format(report.density).rjust(12)}{('yes' if report.feasible else 'no').rjust(11)}{('yes' if report.gfb_schedulable else 'no').rjust(17)}{'{:.6f}'.format(report.miss_ratio).rjust(13)}"
+    )
+  return "\n".join(res)
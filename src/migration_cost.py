@@ -0,0 +1,73 @@
+# cost of migrations: execution time of migrated jobs against their non-migrated siblings,
+# exec block durations right after a migration, and when migrations happen relative to the release
+
+from task_model import *
+
+import numpy as np
+
+# represents a migration joined with its job
+class MigrationSample:
+  def __init__(self, migration: Migration, job: CompletedJob, sibling_exec_time: float | None, post_block: int | None, baseline_block: float | None):
+    self.src_cpu_id = migration.src_cpu_id
+    self.dst_cpu_id = migration.dst_cpu_id
+    release = job.release_time if job.release_time is not None else job.runnable_time if job.runnable_time is not None else job.userspace_release_time
+    self.release_offset = migration.time - release # time after release (negative if before the release was observed)
+    self.exec_time = job.exec_time
+    self.exec_delta = None if sibling_exec_time is None else job.exec_time - sibling_exec_time # against the median of non-migrated siblings
+    self.post_block = post_block # duration of the first exec block after the migration (needs exec blocks)
+    self.post_block_delta = None if post_block is None or baseline_block is None else post_block - baseline_block
+
+# median, or None if empty
+def median(values: list[int | float]) -> float | None:
+  return float(np.median(values)) if len(values) > 0 else None
+
+def migration_samples(taskset: CompletedTaskset) -> list[MigrationSample]:
+  samples: list[MigrationSample] = []
+  for task in taskset.tasks:
+    jobs = dict((job.job_id, job) for job in task.completed_jobs if job.exit_status != CompletedJob.ExitStatus.ABORTED)
+    migrated_job_ids = set(migration.job_id for migration in task.migrations)
+    siblings = [ job for job in jobs.values() if job.job_id not in migrated_job_ids ]
+    sibling_exec_time = median([ job.exec_time for job in siblings ])
+    baseline_block = median([ block.end_time - block.start_time for job in siblings if job.exec_blocks for block in job.exec_blocks ])
+    for migration in task.migrations:
+      job = jobs.get(migration.job_id)
+      if job is None:
+        continue
+      post_block = None
+      if job.exec_blocks is not None:
+        post_block = next((block.end_time - block.start_time for block in job.exec_blocks if block.start_time >= migration.time), None)
+      samples.append(MigrationSample(migration, job, sibling_exec_time, post_block, baseline_block))
+  return samples
+
+# represents the migration cost report of a set of migrations
+class MigrationReport:
+  def __init__(self, name: str, samples: list[MigrationSample]):
+    self.name = name
+    self.samples = samples
+
+  def report_str(self) -> str:
+    res: list[str] = [ f"MIGRATIONS ({self.name}): {len(self.samples)}" ]
+    if len(self.samples) == 0:
+      return res[0]
+
+    offsets = np.array([ sample.release_offset for sample in self.samples ], dtype=np.int64)
+    res.append(f"time after release (ns): min {offsets.min()}, median {'{:.1f}'.format(np.median(offsets))}, p90 {'{:.1f}'.format(np.percentile(offsets, 90))}, max {offsets.max()}")
+    res.append("")
+    res.append("  src -> dst   count  median exec (ns)  median exec delta vs non-migrated (ns)  median post-migration block (ns)  median post-block delta (ns)  median time after release (ns)")
+    pairs: dict[tuple[int, int], list[MigrationSample]] = {}
+    for sample in self.samples:
+      pairs.setdefault((sample.src_cpu_id, sample.dst_cpu_id), []).append(sample)
+    def fmt(v: float | None, width: int):
+      return ("-" if v is None else "{:.1f}".format(v)).rjust(width)
+    for (src, dst), samples in sorted(pairs.items()):
+      res.append(
+        f" - {str(src).rjust(4)} -> {str(dst).ljust(4)}{str(len(samples)).rjust(6)}"
+        f"{fmt(median([ s.exec_time for s in samples ]), 18)}"
+        f"{fmt(median([ s.exec_delta for s in samples if s.exec_delta is not None ]), 40)}"
+        f"{fmt(median([ s.post_block for s in samples if s.post_block is not None ]), 34)}"
+        f"{fmt(median([ s.post_block_delta for s in samples if s.post_block_delta is not None ]), 29)}"
+        f"{fmt(median([ s.release_offset for s in samples ]), 32)}"
+      )
+    if all(sample.post_block is None for sample in self.samples):
+      res.append("(post-migration blocks need job exec blocks: run with --exec-blocks)")
+    return "\n".join(res)
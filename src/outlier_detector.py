@@ -0,0 +1,133 @@
+# streaming outlier detection of scheduler function durations and job metrics
+# each metric keeps a rolling median/MAD over a bounded window of its last occurrences; an occurrence far above
+# the median captures the events around it on its cpu and the concurrent jobs, keeping only the top N per taskset
+
+from utils.pretty_time import time2str
+
+from bisect import bisect_left, insort
+from collections import deque
+from typing import Callable
+import heapq
+
+OUTLIER_WINDOW = 512 # occurrences per metric the rolling statistics are computed over
+OUTLIER_MIN_SAMPLES = 32 # occurrences of a metric needed before flagging outliers
+OUTLIER_RESCALE_PERIOD = 64 # occurrences between recomputations of the MAD
+OUTLIER_CONTEXT_EVENTS = 8 # events captured on the cpu before (including the triggering one) and after an outlier
+MAD_TO_STDDEV = 1.4826 # MAD scale factor of a normal distribution
+
+# rolling median and median absolute deviation over the last occurrences of a metric
+class RollingRobustStats:
+  def __init__(self, window: int = OUTLIER_WINDOW):
+    self.window = window
+    self.values: deque[int] = deque() # in arrival order
+    self.sorted_values: list[int] = []
+    self.scale = 1.0 # robust standard deviation estimate (cached)
+    self.stale = OUTLIER_RESCALE_PERIOD # occurrences since the scale was computed
+
+  @property
+  def median(self) -> int:
+    return self.sorted_values[len(self.sorted_values) // 2]
+
+  # robust z-score of a value against the window (None during warmup)
+  def score(self, value: int) -> float | None:
+    if len(self.sorted_values) < OUTLIER_MIN_SAMPLES:
+      return None
+    median = self.median
+    if self.stale >= OUTLIER_RESCALE_PERIOD:
+      deviations = sorted(abs(v - median) for v in self.sorted_values)
+      # floor the scale so metrics with (nearly) constant values do not flag every jitter
+      self.scale = max(MAD_TO_STDDEV * deviations[len(deviations) // 2], 0.01 * abs(median), 1.0)
+      self.stale = 0
+    return (value - median) / self.scale
+
+  def add(self, value: int):
+    self.values.append(value)
+    insort(self.sorted_values, value)
+    if len(self.values) > self.window:
+      del self.sorted_values[bisect_left(self.sorted_values, self.values.popleft())]
+    self.stale += 1
+
+# represents an extreme occurrence of a metric with its context
+class Anomaly:
+  def __init__(self, metric: str, value: int, median: int, score: float, time: int, cpu_id: int, events: list[tuple[int, str]], jobs: list[tuple[int, int, int, bool, int]]):
+    self.metric = metric
+    self.value = value
+    self.median = median # rolling median when the occurrence happened
+    self.score = score # robust z-score
+    self.time = time
+    self.cpu_id = cpu_id
+    self.events = events # (time, event name) on the cpu around the occurrence
+    self.jobs = jobs # concurrent jobs as (task id, job id, cpu id, is executing, absolute deadline)
+    self.pending_events = OUTLIER_CONTEXT_EVENTS # events after the occurrence still to capture
+
+  def __str__(self):
+    res = [ f" - [{time2str(self.time)}] {self.metric} (cpu{self.cpu_id}): {self.value} ns, median {self.median} ns, score {'{:.1f}'.format(self.score)}" ]
+    res.append("     events on cpu:")
+    for time, name in self.events:
+      res.append(f"       {'{:+d}'.format(time - self.time).rjust(12)} ns  {name}")
+    res.append("     concurrent jobs:" + ("" if len(self.jobs) > 0 else " none"))
+    for task_id, job_id, cpu_id, is_executing, absolute_deadline in self.jobs:
+      state = f"running on cpu{cpu_id}" if is_executing else "ready/blocked"
+      res.append(f"       T{task_id}J{job_id} {state}, deadline in {absolute_deadline - self.time} ns")
+    return "\n".join(res)
+
+# detects outliers as events are tracked, in memory bounded by the number of metrics, cpus and top anomalies
+class OutlierDetector:
+  def __init__(self, top_n: int, threshold: float):
+    self.top_n = top_n
+    self.threshold = threshold
+    self.stats: dict[str, RollingRobustStats] = {} # metric name -> rolling statistics (kept across tasksets)
+    self.cpu_events: dict[int, deque[tuple[int, str]]] = {} # cpu id -> recent (time, event name)
+    self.capturing: dict[int, list[Anomaly]] = {} # cpu id -> anomalies still capturing subsequent events
+    self.top: list[tuple[float, int, Anomaly]] = [] # min-heap of the current taskset's anomalies by score
+    self.count = 0 # tie breaker of the heap
+
+  def record_event(self, cpu_id: int, time: int, name: str):
+    events = self.cpu_events.get(cpu_id)
+    if events is None:
+      events = self.cpu_events[cpu_id] = deque(maxlen=OUTLIER_CONTEXT_EVENTS)
+    events.append((time, name))
+
+    capturing = self.capturing.get(cpu_id)
+    if capturing:
+      for anomaly in capturing:
+        anomaly.events.append((time, name))
+        anomaly.pending_events -= 1
+      self.capturing[cpu_id] = [ anomaly for anomaly in capturing if anomaly.pending_events > 0 ]
+
+  # jobs: concurrent jobs, only evaluated if the occurrence makes it into the top anomalies (None outside of tasksets)
+  def observe(self, metric: str, value: int, time: int, cpu_id: int, jobs: Callable[[], list[tuple[int, int, int, bool, int]]] | None):
+    stats = self.stats.get(metric)
+    if stats is None:
+      stats = self.stats[metric] = RollingRobustStats()
+    score = stats.score(value)
+    median = stats.median if score is not None else 0
+    stats.add(value)
+
+    if jobs is None or score is None or score < self.threshold:
+      return
+    if len(self.top) >= self.top_n and score <= self.top[0][0]:
+      return
+
+    anomaly = Anomaly(metric, value, median, score, time, cpu_id, list(self.cpu_events.get(cpu_id, [])), jobs())
+    self.capturing.setdefault(cpu_id, []).append(anomaly)
+    self.count += 1
+    if len(self.top) >= self.top_n:
+      _, _, dropped = heapq.heapreplace(self.top, (score, self.count, anomaly))
+      if dropped in self.capturing.get(dropped.cpu_id, []):
+        self.capturing[dropped.cpu_id].remove(dropped)
+    else:
+      heapq.heappush(self.top, (score, self.count, anomaly))
+
+  # anomalies of the current taskset by decreasing score (resets them for the next taskset)
+  def take_anomalies(self) -> list[Anomaly]:
+    anomalies = [ anomaly for _, _, anomaly in sorted(self.top, reverse=True) ]
+    self.top = []
+    self.capturing = {}
+    return anomalies
+
+def anomalies_str(name: str, anomalies: list[Anomaly], top_n: int) -> str:
+  res = [ f"TOP ANOMALIES ({name}): {len(anomalies)}" ]
+  for anomaly in sorted(anomalies, key=lambda a : a.score, reverse=True)[:top_n]:
+    res.append(str(anomaly))
+  return "\n".join(res)
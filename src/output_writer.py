@@ -0,0 +1,177 @@
+# writes the stats, summaries and visualizations of completed tasksets to the output directory
+
+from task_model import *
+from config import Config
+from outlier_detector import anomalies_str
+from data_quality import combined_quality_str, meets_min_quality
+
+# the analysis modules (and numpy) are imported by the sections writing their outputs, so only the requested
+# analyses (Config.analyses) are loaded
+
+# sections: additional summaries placed between the table and the raw data
+def exec_data_str(exec_data: dict[str, ExecData], sections: list[str] = []) -> str:
+  ordered_data = list(exec_data.values())
+  ordered_data.sort(key = lambda data : (data.name.split(":")[0], -data.count))
+  res: list[str] = []
+  res.append("TABLE")
+  res.append("                   name               count                 min                mean              median                 max")
+  for data in ordered_data:
+    name = data.name.rjust(30, " ")
+    def fmt(v: int | float):
+      return "{:.3f}".format(v).rjust(20, " ")
+    def ifmt(v: int):
+      return str(v).rjust(20, " ")
+    res.append(f" - {name}{ifmt(data.count)}{ifmt(data.min_runtime)}{fmt(data.mean_runtime)}{fmt(data.median_runtime)}{ifmt(data.max_runtime)}")
+
+  for section in sections:
+    res.append("")
+    res.append(section)
+
+  res.append("")
+  res.append("RAW DATA")
+  for data in ordered_data:
+    dura_strs = ", ".join(str(dura) for dura in data.durations)
+    res.append(f"{data.name}: [{dura_strs}]")
+  return "\n".join(res)
+
+def quarantine_str(quarantined_tasksets: list[QuarantinedTaskset]) -> str:
+  res: list[str] = [ f"QUARANTINED TASKSETS ({len(quarantined_tasksets)})" ]
+  for quarantined in quarantined_tasksets:
+    res.append(str(quarantined))
+  return "\n".join(res)
+
+# combine the exec data of multiple tasksets by name (without modifying the tasksets' exec data)
+def combine_exec_data(tasksets: list[CompletedTaskset]) -> dict[str, ExecData]:
+  combined_exec_data: dict[str, ExecData] = {}
+  for ts in tasksets:
+    for data in ts.exec_data.values():
+      if data.name in combined_exec_data:
+        combined_exec_data[data.name].extend(data)
+      else:
+        combined_exec_data[data.name] = ExecData(data.name, list(data.durations))
+  return combined_exec_data
+
+# whether a taskset's results are used in the combined statistics (per taskset outputs are written regardless)
+def is_combined(taskset: CompletedTaskset, config: Config) -> bool:
+  return meets_min_quality(taskset.quality, config.min_quality)
+
+# cost of a single sfunc tracepoint, given or estimated from the calibration taskset (or all combined tasksets)
+#   tasksets: all tasksets (the calibration taskset is used even if left out of the combined statistics)
+def probe_overhead(tasksets: list[CompletedTaskset], config: Config) -> "ProbeOverhead | None":
+  from call_tree import ProbeOverhead
+  from block_arrays import sfunc_arrays
+  if config.probe_overhead_ns is not None:
+    return ProbeOverhead(config.probe_overhead_ns, "given")
+  if config.probe_calibration_taskset is not None:
+    calibration = [ ts for ts in tasksets if ts.taskset_id == config.probe_calibration_taskset ]
+    if len(calibration) == 0:
+      raise Exception(f"Calibration taskset {config.probe_calibration_taskset} not found")
+    return ProbeOverhead.estimate([ sfunc_arrays(ts) for ts in calibration ], f"calibration taskset {config.probe_calibration_taskset}")
+  return ProbeOverhead.estimate([ sfunc_arrays(ts) for ts in tasksets if is_combined(ts, config) ], "all tasksets")
+
+def write_call_tree_profile(profile: "CallTreeProfile", path_prefix: str, probe: "ProbeOverhead | None" = None):
+  with open(f"{path_prefix}_sfunc_profile.txt", "w") as file:
+    file.write(profile.table_str(probe))
+  with open(f"{path_prefix}_sfunc_profile.folded", "w") as file:
+    file.write(profile.collapsed_str())
+
+def write_output(tasksets: list[CompletedTaskset], quarantined_tasksets: list[QuarantinedTaskset], config: Config):
+  # estimated first, so a missing calibration taskset fails before any output is written
+  probe = probe_overhead(tasksets, config) if config.writes("sfunc_profile") else None
+
+  # output data quality (lossy tasksets may be left out of the combined outputs)
+  for ts in tasksets:
+    with open(f"{config.output_path}/taskset_{ts.taskset_id}_data_quality.txt", "w") as file:
+      file.write(ts.quality.report_str())
+    if config.writes("timelines"):
+      ts.quality.save_rates(f"{config.output_path}/taskset_{ts.taskset_id}_event_rates.npz")
+  quality_summary = combined_quality_str([ (ts.taskset_id, ts.quality) for ts in tasksets ], config.min_quality)
+  with open(f"{config.output_path}/combined_data_quality.txt", "w") as file:
+    file.write(quality_summary)
+  combined = [ ts for ts in tasksets if is_combined(ts, config) ]
+  if len(combined) < len(tasksets) or any(ts.quality.is_lossy for ts in tasksets):
+    print(quality_summary)
+
+  # output exec data and overhead timelines
+  timeline_summaries: dict[int, str] = {} # taskset id -> overhead summary
+  combined_sections = [ quality_summary ]
+  if config.writes("timelines"):
+    from overhead_timeline import OverheadTimeline, combined_overhead_str
+    combined_timelines: list[OverheadTimeline] = []
+    for ts in tasksets:
+      timeline = OverheadTimeline(ts, config.overhead_bucket_ns)
+      timeline.save(f"{config.output_path}/taskset_{ts.taskset_id}_overhead.npz")
+      timeline_summaries[ts.taskset_id] = timeline.summary_str()
+      if is_combined(ts, config):
+        combined_timelines.append(timeline)
+    combined_sections.append(combined_overhead_str(combined_timelines))
+  for ts in tasksets:
+    with open(f"{config.output_path}/taskset_{ts.taskset_id}_stats.txt", "w") as file:
+      sections = [ ts.quality.summary_str() ] + ([ timeline_summaries[ts.taskset_id] ] if ts.taskset_id in timeline_summaries else [])
+      file.write(exec_data_str(ts.exec_data, sections))
+  with open(f"{config.output_path}/combined_taskset_stats.txt", "w") as file:
+    file.write(exec_data_str(combine_exec_data(combined), combined_sections))
+
+  # output sfunc call tree profiles
+  if config.writes("sfunc_profile"):
+    from call_tree import CallTreeProfile
+    profiles: list[CallTreeProfile] = []
+    for ts in tasksets:
+      profiles.append(CallTreeProfile.from_taskset(ts))
+      write_call_tree_profile(profiles[-1], f"{config.output_path}/taskset_{ts.taskset_id}", probe)
+    combined_profiles = [ profile for ts, profile in zip(tasksets, profiles) if is_combined(ts, config) ]
+    write_call_tree_profile(CallTreeProfile.combine(combined_profiles), f"{config.output_path}/combined_taskset", probe)
+
+  # output job reports
+  if config.writes("job_report"):
+    from job_report import JobReport, combined_job_report_str
+    reports = [ JobReport(ts) for ts in tasksets ]
+    for report in reports:
+      with open(f"{config.output_path}/taskset_{report.taskset_id}_job_report.txt", "w") as file:
+        file.write(report.report_str())
+    with open(f"{config.output_path}/combined_job_report.txt", "w") as file:
+      file.write(combined_job_report_str([ report for ts, report in zip(tasksets, reports) if is_combined(ts, config) ]))
+
+  # output migration cost reports
+  if config.writes("migration"):
+    from migration_cost import MigrationReport, migration_samples
+    all_samples = []
+    for ts in tasksets:
+      samples = migration_samples(ts)
+      if is_combined(ts, config):
+        all_samples.extend(samples)
+      with open(f"{config.output_path}/taskset_{ts.taskset_id}_migration_report.txt", "w") as file:
+        file.write(MigrationReport(f"taskset {ts.taskset_id}", samples).report_str())
+    with open(f"{config.output_path}/combined_migration_report.txt", "w") as file:
+      file.write(MigrationReport("combined", all_samples).report_str())
+
+  # output global EDF violation reports
+  if config.writes("ready_queue"):
+    from ready_queue import ReadyQueueReport
+    ready_queue_reports = [ ReadyQueueReport.from_taskset(ts) for ts in tasksets ]
+    for ts, report in zip(tasksets, ready_queue_reports):
+      with open(f"{config.output_path}/taskset_{ts.taskset_id}_ready_queue.txt", "w") as file:
+        file.write(report.report_str())
+    with open(f"{config.output_path}/combined_ready_queue.txt", "w") as file:
+      file.write(ReadyQueueReport.combine([ report for ts, report in zip(tasksets, ready_queue_reports) if is_combined(ts, config) ]).report_str())
+
+  # output anomalies found while tracking
+  if config.outliers > 0 and config.writes("anomalies"):
+    for ts in tasksets:
+      with open(f"{config.output_path}/taskset_{ts.taskset_id}_anomalies.txt", "w") as file:
+        file.write(anomalies_str(f"taskset {ts.taskset_id}", ts.anomalies, config.outliers))
+    with open(f"{config.output_path}/combined_anomalies.txt", "w") as file:
+      file.write(anomalies_str("combined", [ anomaly for ts in combined for anomaly in ts.anomalies ], config.outliers))
+
+  # output quarantine summary
+  if config.lenient:
+    summary = quarantine_str(quarantined_tasksets)
+    with open(f"{config.output_path}/quarantine_summary.txt", "w") as file:
+      file.write(summary)
+    print(summary)
+
+  # output visualizations
+  if config.render:
+    from visualizer import render
+    for taskset in tasksets:
+      render(taskset, f"{config.output_path}/taskset_{taskset.taskset_id}.svg", config)
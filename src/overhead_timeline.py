@@ -0,0 +1,104 @@
+# per-cpu scheduler overhead over time: fraction of each fixed time bucket spent in
+# (outermost) scheduler functions and context switches
+
+from task_model import *
+from block_arrays import sfunc_arrays
+
+import numpy as np
+
+WORST_WINDOWS = 5 # number of worst windows listed in the summary
+
+# merge possibly overlapping intervals into sorted disjoint intervals
+def union_intervals(starts: np.ndarray, ends: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+  if len(starts) == 0:
+    return starts, ends
+  order = np.argsort(starts, kind="stable")
+  starts = starts[order]
+  ends = np.maximum.accumulate(ends[order])
+  new_run = np.empty(len(starts), dtype=bool)
+  new_run[0] = True
+  new_run[1:] = starts[1:] > ends[:-1]
+  run_starts = starts[new_run]
+  run_ends = np.append(ends[np.nonzero(new_run)[0][1:] - 1], ends[-1])
+  return run_starts, run_ends
+
+# time covered by sorted disjoint intervals in each bucket between consecutive edges
+def bin_intervals(starts: np.ndarray, ends: np.ndarray, edges: np.ndarray) -> np.ndarray:
+  if len(starts) == 0:
+    return np.zeros(len(edges) - 1, dtype=np.int64)
+  covered_before = np.concatenate([ [ 0 ], np.cumsum(ends - starts) ])
+  # covered time up to each edge: fully ended intervals + the part of the interval the edge falls in
+  ended = np.searchsorted(ends, edges, side="right")
+  started = np.searchsorted(starts, edges, side="right")
+  partial = np.where(started > ended, edges - starts[np.minimum(ended, len(starts) - 1)], 0)
+  return np.diff(covered_before[ended] + partial)
+
+# represents the overhead fraction time series of each cpu of a taskset
+class OverheadTimeline:
+  def __init__(self, taskset: CompletedTaskset, bucket_ns: int):
+    self.taskset_id = taskset.taskset_id
+    self.bucket_ns = bucket_ns
+    self.start_time = taskset.init_time
+    n_buckets = max(1, -(-(taskset.completion_time - taskset.init_time) // bucket_ns))
+    self.edges = taskset.init_time + np.arange(n_buckets + 1, dtype=np.int64) * bucket_ns
+    bucket_lens = np.diff(np.minimum(self.edges, max(taskset.completion_time, taskset.init_time + 1))).astype(np.float64)
+
+    arrays = sfunc_arrays(taskset)
+    outermost = arrays.nesting == 0
+    sfunc_cpus = arrays.cpu_ids[outermost]
+    sfunc_starts = arrays.entry_times[outermost]
+    sfunc_ends = arrays.exit_times[outermost]
+    cswitch_cpus = np.fromiter((block.cpu_id for block in taskset.cswitch_blocks), dtype=np.int32, count=len(taskset.cswitch_blocks))
+    cswitch_starts = np.fromiter((block.start_time for block in taskset.cswitch_blocks), dtype=np.int64, count=len(taskset.cswitch_blocks))
+    cswitch_ends = np.fromiter((block.end_time for block in taskset.cswitch_blocks), dtype=np.int64, count=len(taskset.cswitch_blocks))
+
+    self.cpu_ids = np.unique(np.concatenate([ sfunc_cpus, cswitch_cpus ])).astype(np.int32)
+    shape = (len(self.cpu_ids), n_buckets)
+    self.sfunc = np.zeros(shape, dtype=np.float32) # fraction of time in outermost sfuncs
+    self.cswitch = np.zeros(shape, dtype=np.float32) # fraction of time context switching
+    self.total = np.zeros(shape, dtype=np.float32) # fraction of time in either
+    for row, cpu_id in enumerate(self.cpu_ids):
+      sfunc_mask = sfunc_cpus == cpu_id
+      cswitch_mask = cswitch_cpus == cpu_id
+      sfunc = union_intervals(sfunc_starts[sfunc_mask], sfunc_ends[sfunc_mask])
+      cswitch = union_intervals(cswitch_starts[cswitch_mask], cswitch_ends[cswitch_mask])
+      total = union_intervals(np.concatenate([ sfunc[0], cswitch[0] ]), np.concatenate([ sfunc[1], cswitch[1] ]))
+      self.sfunc[row] = bin_intervals(*sfunc, self.edges) / bucket_lens
+      self.cswitch[row] = bin_intervals(*cswitch, self.edges) / bucket_lens
+      self.total[row] = bin_intervals(*total, self.edges) / bucket_lens
+
+  # (cpu id, bucket start time, total overhead fraction) of the worst windows
+  def worst_windows(self, count: int = WORST_WINDOWS) -> list[tuple[int, int, float]]:
+    if self.total.size == 0:
+      return []
+    flat = np.argsort(-self.total, axis=None, kind="stable")[:count]
+    rows, cols = np.unravel_index(flat, self.total.shape)
+    return [ (int(self.cpu_ids[row]), int(self.edges[col]), float(self.total[row, col])) for row, col in zip(rows, cols) ]
+
+  def save(self, path: str):
+    np.savez_compressed(path, cpu_ids=self.cpu_ids, bucket_start_times=self.edges[:-1], bucket_ns=self.bucket_ns, sfunc=self.sfunc, cswitch=self.cswitch, total=self.total)
+
+  def summary_str(self) -> str:
+    res: list[str] = []
+    res.append(f"SCHEDULER OVERHEAD (fraction of cpu time, {self.bucket_ns}ns buckets)")
+    res.append("     cpu          mean sfunc        mean cswitch          mean total           max total")
+    for row, cpu_id in enumerate(self.cpu_ids):
+      def fmt(v: float):
+        return "{:.6f}".format(v).rjust(20, " ")
+      res.append(f" - {str(cpu_id).rjust(5)}{fmt(self.sfunc[row].mean())}{fmt(self.cswitch[row].mean())}{fmt(self.total[row].mean())}{fmt(self.total[row].max())}")
+    res.append("worst windows:")
+    for cpu_id, time, fraction in self.worst_windows():
+      res.append(f" - cpu{cpu_id} [{time - self.start_time}ns, +{self.bucket_ns}ns]: {'{:.6f}'.format(fraction)}")
+    return "\n".join(res)
+
+# summary of the per-taskset timelines for the combined stats
+def combined_overhead_str(timelines: list[OverheadTimeline]) -> str:
+  res: list[str] = []
+  res.append("SCHEDULER OVERHEAD (fraction of cpu time)")
+  res.append("     taskset          mean total           max total  worst window")
+  for timeline in timelines:
+    worst = timeline.worst_windows(1)
+    mean = float(timeline.total.mean()) if timeline.total.size > 0 else 0.0
+    worst_str = "-" if len(worst) == 0 else f"cpu{worst[0][0]} at {worst[0][1] - timeline.start_time}ns"
+    res.append(f" - {str(timeline.taskset_id).rjust(9)}{'{:.6f}'.format(mean).rjust(20)}{'{:.6f}'.format(worst[0][2] if len(worst) > 0 else 0.0).rjust(20)}  {worst_str}")
+  return "\n".join(res)
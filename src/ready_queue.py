@@ -0,0 +1,195 @@
+# ready queue reconstruction: sweeps the jobs' waiting intervals (runnable but not running) against what each cpu runs
+# to find global EDF violations, i.e. a job waiting while a cpu is idle or runs a job with a later absolute deadline
+# the cpu a waiting job is being switched in on is not counted as idle (its idle time until the switch is the job's
+# wakeup latency, reported with the job stats)
+
+from task_model import *
+from utils.pretty_time import time2str
+
+import heapq
+import numpy as np
+
+IDLE_WHILE_READY = "idle_while_ready"
+PRIORITY_INVERSION = "priority_inversion"
+VIOLATION_KINDS = [ IDLE_WHILE_READY, PRIORITY_INVERSION ]
+
+# sweep event kinds (order within the same time does not matter, state is only sampled between times)
+WAIT_START = 0
+WAIT_END = 1
+RUN_START = 2
+RUN_END = 3
+IDLE_START = 4
+IDLE_END = 5
+
+# represents a maximal interval during which a violation held
+class Violation:
+  def __init__(self, kind: str, start_time: int, end_time: int, task_id: int, job_id: int, cpu_id: int):
+    self.kind = kind
+    self.start_time = start_time
+    self.end_time = end_time
+    self.task_id = task_id # earliest deadline waiting job when the violation started
+    self.job_id = job_id
+    self.cpu_id = cpu_id # idle cpu or cpu running the later deadline job when the violation started
+
+  @property
+  def duration(self) -> int:
+    return self.end_time - self.start_time
+
+# min heap with lazy deletion
+class LazyHeap:
+  def __init__(self):
+    self.heap: list[tuple] = []
+    self.removed: dict[tuple, int] = {}
+
+  def push(self, item: tuple):
+    heapq.heappush(self.heap, item)
+
+  def remove(self, item: tuple):
+    self.removed[item] = self.removed.get(item, 0) + 1
+
+  def top(self) -> tuple | None:
+    while len(self.heap) > 0 and self.removed.get(self.heap[0], 0) > 0:
+      self.removed[self.heap[0]] -= 1
+      heapq.heappop(self.heap)
+    return self.heap[0] if len(self.heap) > 0 else None
+
+# sweep events of a taskset as (time, kind, deadline, task_id, job_id, cpu_id)
+# (cpu_id of waits: cpu the job was switched in on when the wait ended, -1 if never)
+# None if the jobs' exec blocks were not kept
+def sweep_events(taskset: CompletedTaskset) -> list[tuple[int, int, int, int, int, int]] | None:
+  events: list[tuple[int, int, int, int, int, int]] = []
+  cpu_ids: set[int] = set()
+  for job in taskset.jobs:
+    if job.exec_blocks is None or job.runnable_intervals is None:
+      return None
+    # run intervals: the exec blocks, which start at the job_release tracepoint, plus the thread already running
+    # from its first switch in until then, clipped at the job's completion (the thread keeps running after it)
+    runs = [ (block.start_time, block.end_time, block.cpu_id) for block in job.exec_blocks ]
+    if job.first_run_time is not None and job.first_run_cpu != -1 and job.first_run_time < job.userspace_release_time:
+      runs.append((job.first_run_time, job.userspace_release_time, job.first_run_cpu))
+    for start_time, end_time, cpu_id in runs:
+      end_time = min(end_time, job.completion_time)
+      cpu_ids.add(cpu_id)
+      if start_time < end_time:
+        events.append((start_time, RUN_START, job.absolute_deadline, job.task_id, job.job_id, cpu_id))
+        events.append((end_time, RUN_END, job.absolute_deadline, job.task_id, job.job_id, cpu_id))
+
+    # waiting intervals: when the job was runnable (blocked gaps between exec blocks are not waits)
+    for start_time, end_time, cpu_id in job.runnable_intervals:
+      if start_time < end_time:
+        events.append((start_time, WAIT_START, job.absolute_deadline, job.task_id, job.job_id, cpu_id))
+        events.append((end_time, WAIT_END, job.absolute_deadline, job.task_id, job.job_id, cpu_id))
+
+  # only the cpus the taskset ran on are candidates for its jobs
+  for block in taskset.idle_blocks:
+    if block.cpu_id in cpu_ids and block.start_time < block.end_time:
+      events.append((block.start_time, IDLE_START, 0, -1, -1, block.cpu_id))
+      events.append((block.end_time, IDLE_END, 0, -1, -1, block.cpu_id))
+  events.sort()
+  return events
+
+def add_count(counts: dict, key, delta: int):
+  counts[key] = counts.get(key, 0) + delta
+  if counts[key] == 0:
+    del counts[key]
+
+# find the global EDF violations of a taskset in O(n (log n + m)) over its exec, wait and idle intervals (m cpus)
+# None if the jobs' exec blocks were not kept
+def find_violations(taskset: CompletedTaskset) -> list[Violation] | None:
+  events = sweep_events(taskset)
+  if events is None:
+    return None
+
+  waiting = LazyHeap() # (deadline, task_id, job_id)
+  running = LazyHeap() # (-deadline, cpu_id, task_id, job_id)
+  waiting_jobs: dict[tuple[int, int, int, int], int] = {} # (deadline, task_id, job_id, cpu switched in on) -> count
+  waiting_cpus: dict[int, int] = {} # cpu switched in on -> waiting jobs
+  idle: dict[int, int] = {} # idle cpu id -> count
+  active: dict[str, Violation] = {}
+  violations: list[Violation] = []
+  i = 0
+  while i < len(events):
+    time = events[i][0]
+    while i < len(events) and events[i][0] == time:
+      _, kind, deadline, task_id, job_id, cpu_id = events[i]
+      if kind == WAIT_START:
+        waiting.push((deadline, task_id, job_id))
+        add_count(waiting_jobs, (deadline, task_id, job_id, cpu_id), 1)
+        add_count(waiting_cpus, cpu_id, 1)
+      elif kind == WAIT_END:
+        waiting.remove((deadline, task_id, job_id))
+        add_count(waiting_jobs, (deadline, task_id, job_id, cpu_id), -1)
+        add_count(waiting_cpus, cpu_id, -1)
+      elif kind == RUN_START: running.push((-deadline, cpu_id, task_id, job_id))
+      elif kind == RUN_END: running.remove((-deadline, cpu_id, task_id, job_id))
+      elif kind == IDLE_START: add_count(idle, cpu_id, 1)
+      else: add_count(idle, cpu_id, -1)
+      i += 1
+
+    # sample the state holding until the next event
+    earliest = waiting.top()
+    latest = running.top()
+    # jobs waiting on a cpu other than the idle cpu they are being switched in on
+    idle_waiting = len(idle) > 0 and sum(waiting_cpus.values()) > sum(waiting_cpus.get(cpu_id, 0) for cpu_id in idle)
+    holds = {
+      IDLE_WHILE_READY: idle_waiting,
+      PRIORITY_INVERSION: earliest is not None and latest is not None and -latest[0] > earliest[0],
+    }
+    for violation_kind, held in holds.items():
+      if held and violation_kind not in active:
+        if violation_kind == IDLE_WHILE_READY:
+          # earliest deadline job not being switched in on an idle cpu, and an idle cpu
+          deadline, task_id, job_id, _ = min(job for job in waiting_jobs if job[3] not in idle)
+          active[violation_kind] = Violation(violation_kind, time, -1, task_id, job_id, min(idle))
+        else:
+          active[violation_kind] = Violation(violation_kind, time, -1, earliest[1], earliest[2], latest[1])
+      elif not held and violation_kind in active:
+        violation = active.pop(violation_kind)
+        violation.end_time = time
+        violations.append(violation)
+
+  # all intervals end by the last event, so no violation is left open
+  violations.sort(key=lambda v : v.start_time)
+  return violations
+
+# represents the ready queue report of a set of tasksets
+class ReadyQueueReport:
+  TOP_VIOLATIONS = 10
+
+  def __init__(self, name: str, span: int, violations: list[Violation] | None):
+    self.name = name
+    self.span = span # total time covered by the swept tasksets
+    self.violations = violations # None if exec blocks were not kept
+
+  @staticmethod
+  def from_taskset(taskset: CompletedTaskset) -> "ReadyQueueReport":
+    return ReadyQueueReport(f"taskset {taskset.taskset_id}", taskset.completion_time - taskset.init_time, find_violations(taskset))
+
+  @staticmethod
+  def combine(reports: list["ReadyQueueReport"]) -> "ReadyQueueReport":
+    violations = None if any(report.violations is None for report in reports) else [ v for report in reports for v in report.violations ]
+    return ReadyQueueReport("combined", sum(report.span for report in reports), violations)
+
+  def report_str(self) -> str:
+    res: list[str] = [ f"GLOBAL EDF VIOLATIONS ({self.name})" ]
+    if self.violations is None:
+      res.append("(ready queue reconstruction needs job exec blocks: run with --exec-blocks)")
+      return "\n".join(res)
+
+    res.append("  kind                    count     total (ns)  % of time    median (ns)       max (ns)")
+    for kind in VIOLATION_KINDS:
+      durations = np.array([ v.duration for v in self.violations if v.kind == kind ], dtype=np.int64)
+      if len(durations) == 0:
+        res.append(f" - {kind.ljust(20)}{'0'.rjust(9)}{'0'.rjust(15)}{'0.000'.rjust(11)}{'-'.rjust(15)}{'-'.rjust(15)}")
+        continue
+      share = 100 * durations.sum() / max(self.span, 1)
+      res.append(f" - {kind.ljust(20)}{str(len(durations)).rjust(9)}{str(durations.sum()).rjust(15)}{'{:.3f}'.format(share).rjust(11)}{'{:.1f}'.format(np.median(durations)).rjust(15)}{str(durations.max()).rjust(15)}")
+
+    longest = sorted(self.violations, key=lambda v : v.duration, reverse=True)[:self.TOP_VIOLATIONS]
+    if len(longest) > 0:
+      res.append("")
+      res.append("longest violations:")
+      for v in longest:
+        blocker = f"cpu{v.cpu_id} idle" if v.kind == IDLE_WHILE_READY else f"cpu{v.cpu_id} running a later deadline"
+        res.append(f" - [{time2str(v.start_time)}] {v.kind}: {v.duration} ns, T{v.task_id}J{v.job_id} waiting, {blocker}")
+    return "\n".join(res)
@@ -0,0 +1,82 @@
+# cache of parsed results so output stages (stats, rendering) can be rerun without parsing the trace again
+
+from task_model import CompletedTaskset, QuarantinedTaskset
+from config import Config
+
+import gzip
+import hashlib
+import os
+import pickle
+
+# bump whenever the tracking logic or the task model changes to invalidate old caches
+PARSER_VERSION = 15
+
+CACHE_FILE = "parse_cache.pkl.gz"
+
+# represents the parsed results of a trace
+class ParseResults:
+  def __init__(self, tasksets: list[CompletedTaskset], quarantined_tasksets: list[QuarantinedTaskset]):
+    self.tasksets = tasksets
+    self.quarantined_tasksets = quarantined_tasksets
+
+# represents what the cached results were parsed from and with
+class CacheHeader:
+  def __init__(self, parser_version: int, trace_key: str, lenient: bool, exec_blocks: bool, outliers: tuple[int, float], sched_classes: list[str] | None):
+    self.parser_version = parser_version
+    self.trace_key = trace_key
+    self.lenient = lenient
+    self.exec_blocks = exec_blocks # whether jobs kept their exec blocks
+    self.outliers = outliers # (top anomalies per taskset, threshold) of the outlier detection
+    self.sched_classes = sched_classes # forced scheduler class profiles (None if selected from the trace)
+
+  # can results parsed with this header be used for the given trace and config?
+  def matches(self, trace_key: str, config: Config) -> bool:
+    return self.parser_version == PARSER_VERSION and self.trace_key == trace_key and self.lenient == config.lenient and (self.exec_blocks or not config.keep_exec_blocks) and self.outliers == (config.outliers, config.outlier_threshold) and self.sched_classes == config.sched_classes
+
+# identify a trace by the names, sizes and modification times of its files
+def trace_key(path: str) -> str:
+  digest = hashlib.sha256()
+  if os.path.isfile(path):
+    stat = os.stat(path)
+    digest.update(f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns}\n".encode())
+  for root, dirs, files in os.walk(path):
+    dirs.sort()
+    for name in sorted(files):
+      file_path = os.path.join(root, name)
+      stat = os.stat(file_path)
+      digest.update(f"{os.path.relpath(file_path, path)}:{stat.st_size}:{stat.st_mtime_ns}\n".encode())
+  return digest.hexdigest()
+
+def cache_path(config: Config) -> str:
+  return os.path.join(config.output_path, CACHE_FILE)
+
+# read a cache file (header only if header_only)
+def read_cache_file(path: str, header_only: bool = False) -> tuple[CacheHeader, ParseResults | None]:
+  with gzip.open(path, "rb") as file:
+    header: CacheHeader = pickle.load(file)
+    if header_only or header.parser_version != PARSER_VERSION:
+      return header, None
+    return header, pickle.load(file)
+
+# load the cached results of a trace if they were parsed from the same trace with a compatible config
+def load_cached_results(trace_path: str, config: Config) -> ParseResults | None:
+  path = cache_path(config)
+  if not os.path.isfile(path):
+    return None
+
+  try:
+    header, _ = read_cache_file(path, header_only=True)
+    if not header.matches(trace_key(trace_path), config):
+      return None
+    return read_cache_file(path)[1]
+  except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError, ModuleNotFoundError):
+    # corrupt or written by an incompatible version of the parser (e.g. a pickled class moved to another module)
+    return None
+
+def save_cached_results(trace_path: str, config: Config, results: ParseResults):
+  header = CacheHeader(PARSER_VERSION, trace_key(trace_path), config.lenient, config.keep_exec_blocks, (config.outliers, config.outlier_threshold), config.sched_classes)
+  tmp_path = cache_path(config) + ".tmp"
+  with gzip.open(tmp_path, "wb", compresslevel=6) as file:
+    pickle.dump(header, file, protocol=pickle.HIGHEST_PROTOCOL)
+    pickle.dump(results, file, protocol=pickle.HIGHEST_PROTOCOL)
+  os.replace(tmp_path, cache_path(config))
@@ -0,0 +1,82 @@
+# scheduler class profiles: which traced functions belong to a class, their roles (pick/enqueue),
+# and how the release timer of a task of that class is recognized
+# to support a new class, add a profile to SCHED_PROFILES (the event handlers and tracker pick it up)
+
+from task_model import Task, CPUState
+from sched_class_funcs import *
+from utils.pretty_time import time2str
+
+# hrtimer modes (enum hrtimer_mode)
+HRTIMER_MODE_REL = 0x01
+HRTIMER_MODE_HARD = 0x08
+
+# represents the scheduler specific logic of a scheduling class
+class SchedClassProfile:
+  def __init__(self, name: str, funcs: list[str], pick_funcs: list[str], enqueue_funcs: list[str], prios: range):
+    self.name = name
+    self.funcs = funcs # traced sched functions of the class
+    self.pick_funcs = pick_funcs
+    self.enqueue_funcs = enqueue_funcs
+    self.prios = prios # priorities of the class's threads as reported by sched_switch (the kernel's prio - MAX_RT_PRIO)
+
+  # task whose next release is triggered by an hrtimer started on cpu (None if not a release timer of this class)
+  #   task: task mapped to the thread running on cpu (None if not part of the taskset)
+  def release_timer_task(self, time: int, cpu: CPUState, task: Task | None, hrtimer: int, mode: int) -> Task | None:
+    return None
+
+  def __str__(self):
+    return self.name
+
+# sched_deadline: the kernel arms the task's replenishment timer during its sched_yield
+class DeadlineProfile(SchedClassProfile):
+  def release_timer_task(self, time: int, cpu: CPUState, task: Task | None, hrtimer: int, mode: int) -> Task | None:
+    # we know the scheduler's hrtimer is triggered when the sfunc stack has yield_task_dl on top
+    # for this one, mode=8 since the kernel is managing it
+    if mode != HRTIMER_MODE_HARD or len(cpu.sfunc_stack) == 0 or cpu.sfunc_stack[-1].name != "yield_task_dl":
+      return None
+    if task is None:
+      raise Exception(f"[{time2str(time)}]: Could not find task mapped to sched_yield's htimer start (hrtimer={hex(hrtimer)}, tid={cpu.curr_tid})")
+    return task
+
+# classes whose tasks sleep until their next release (simulate_tasks' sleep_until)
+# we know the sleep_until hrtimer is triggered when the running thread is mapped to a task which completed
+class SleepReleaseProfile(SchedClassProfile):
+  def __init__(self, name: str, funcs: list[str], pick_funcs: list[str], enqueue_funcs: list[str], prios: range, sleep_modes: list[int]):
+    super().__init__(name, funcs, pick_funcs, enqueue_funcs, prios)
+    self.sleep_modes = sleep_modes # hrtimer modes of the sleep timer (filters out e.g. per-cpu timers)
+
+  def release_timer_task(self, time: int, cpu: CPUState, task: Task | None, hrtimer: int, mode: int) -> Task | None:
+    if mode in self.sleep_modes and task is not None and task.is_completed and task.job_id != -1:
+      return task
+    return None
+
+SCHED_PROFILES: list[SchedClassProfile] = [
+  # deadline threads have prio -1
+  DeadlineProfile("sched_dl", SCHED_DL_CLASS_FUNCS, [ "pick_task_dl" ], [ "enqueue_task_dl" ], range(-101, -100)),
+  # sleep_until uses a relative timer (mode=1), while per-cpu timers use mode=8
+  # sched_ext threads keep their normal prio (100 to 139)
+  SleepReleaseProfile("sched_ext", SCHED_EXT_CLASS_FUNCS, [ "pick_task_scx" ], [ "enqueue_task_scx" ], range(0, 40), [ HRTIMER_MODE_REL ]),
+  # sleepers of realtime tasks are hard timers on PREEMPT_RT kernels
+  # only the sleep_until release of a completed job is recognized: rt has no replenishment timer like sched_dl, and
+  # throttling (sched_rt_runtime_us) is not detected, a throttled job just shows a longer response time
+  SleepReleaseProfile("sched_rt", SCHED_RT_CLASS_FUNCS, [ "pick_task_rt" ], [ "enqueue_task_rt" ], range(-100, 0), [ HRTIMER_MODE_REL, HRTIMER_MODE_REL | HRTIMER_MODE_HARD ]),
+]
+PROFILES_BY_NAME = dict((profile.name, profile) for profile in SCHED_PROFILES)
+PROFILES_BY_FUNC = dict((func, profile) for profile in SCHED_PROFILES for func in profile.funcs)
+PROFILE_FUNCS = [ func for profile in SCHED_PROFILES for func in profile.funcs ]
+
+# profiles of the classes whose functions are traced, according to the event names declared in the trace metadata
+# (all profiles if none or if the event names are unknown)
+def select_profiles(event_names: list[str] | None) -> list[SchedClassProfile]:
+  if event_names is None:
+    return list(SCHED_PROFILES)
+  declared = set(event_names)
+  selected = [ profile for profile in SCHED_PROFILES if any(f"{func}_entry" in declared for func in profile.funcs) ]
+  return selected if len(selected) > 0 else list(SCHED_PROFILES)
+
+# name of the scheduler class of a thread switched in with prio (None if no profile covers it)
+def sched_class_of_prio(prio: int) -> str | None:
+  for profile in SCHED_PROFILES:
+    if prio in profile.prios:
+      return profile.name
+  return None
@@ -0,0 +1,160 @@
+# exports completed tasksets into a SQLite database for ad-hoc queries
+# usable in streaming mode (export each taskset as it completes) by registering export_taskset as a taskset listener
+
+from task_model import *
+
+import os
+import sqlite3
+
+SCHEMA = [
+  """CREATE TABLE tasksets (
+    taskset_id INTEGER PRIMARY KEY,
+    init_time INTEGER,
+    completion_time INTEGER,
+    lost_events INTEGER,
+    lost_packets INTEGER,
+    data_quality REAL
+  )""",
+  """CREATE TABLE tasks (
+    taskset_id INTEGER,
+    task_id INTEGER,
+    period INTEGER,
+    deadline INTEGER,
+    wcet INTEGER,
+    init_time INTEGER,
+    PRIMARY KEY (taskset_id, task_id)
+  )""",
+  """CREATE TABLE jobs (
+    taskset_id INTEGER,
+    task_id INTEGER,
+    job_id INTEGER,
+    release_time INTEGER,
+    userspace_release_time INTEGER,
+    absolute_deadline INTEGER,
+    completion_time INTEGER,
+    exit_status TEXT,
+    migrations INTEGER,
+    preemptions INTEGER,
+    release_delay INTEGER,
+    response_time INTEGER,
+    exec_time INTEGER,
+    runnable_time INTEGER,
+    first_run_time INTEGER,
+    first_run_cpu INTEGER,
+    wakeup_latency INTEGER
+  )""",
+  """CREATE TABLE exec_blocks (
+    taskset_id INTEGER,
+    task_id INTEGER,
+    job_id INTEGER,
+    cpu_id INTEGER,
+    start_time INTEGER,
+    end_time INTEGER,
+    duration INTEGER
+  )""",
+  """CREATE TABLE sfunc_blocks (
+    taskset_id INTEGER,
+    block_id INTEGER,
+    name TEXT,
+    cpu_id INTEGER,
+    parent_id INTEGER,
+    nesting INTEGER,
+    entry_time INTEGER,
+    exit_time INTEGER,
+    duration INTEGER
+  )""",
+  """CREATE TABLE cswitch_blocks (
+    taskset_id INTEGER,
+    cpu_id INTEGER,
+    start_time INTEGER,
+    end_time INTEGER,
+    duration INTEGER,
+    prev_tid INTEGER,
+    next_tid INTEGER,
+    involves_rt INTEGER
+  )""",
+  """CREATE TABLE migrations (
+    taskset_id INTEGER,
+    task_id INTEGER,
+    job_id INTEGER,
+    time INTEGER,
+    src_cpu_id INTEGER,
+    dst_cpu_id INTEGER
+  )""",
+]
+
+# built after all inserts (bulk inserting into indexed tables is much slower)
+INDEXES = [
+  "CREATE INDEX jobs_task ON jobs (taskset_id, task_id, job_id)",
+  "CREATE INDEX jobs_release ON jobs (taskset_id, release_time)",
+  "CREATE INDEX exec_blocks_job ON exec_blocks (taskset_id, task_id, job_id)",
+  "CREATE INDEX exec_blocks_cpu ON exec_blocks (taskset_id, cpu_id, start_time)",
+  "CREATE INDEX sfunc_blocks_name ON sfunc_blocks (taskset_id, name)",
+  "CREATE INDEX sfunc_blocks_cpu ON sfunc_blocks (taskset_id, cpu_id, entry_time)",
+  "CREATE INDEX sfunc_blocks_parent ON sfunc_blocks (taskset_id, parent_id)",
+  "CREATE INDEX cswitch_blocks_cpu ON cswitch_blocks (taskset_id, cpu_id, start_time)",
+  "CREATE INDEX migrations_job ON migrations (taskset_id, task_id, job_id)",
+  "CREATE INDEX migrations_time ON migrations (taskset_id, time)",
+]
+
+class SqliteExporter:
+  # overwrites any existing database at path
+  def __init__(self, path: str):
+    if os.path.exists(path):
+      os.remove(path)
+    self.path = path
+    self.conn = sqlite3.connect(path)
+    self.conn.execute("PRAGMA journal_mode = OFF")
+    self.conn.execute("PRAGMA synchronous = OFF")
+    for statement in SCHEMA:
+      self.conn.execute(statement)
+
+  def export_taskset(self, taskset: CompletedTaskset):
+    ts_id = taskset.taskset_id
+    conn = self.conn
+    quality = taskset.quality
+    conn.execute("INSERT INTO tasksets VALUES (?, ?, ?, ?, ?, ?)", (ts_id, taskset.init_time, taskset.completion_time, quality.lost_events, quality.lost_packets, quality.score))
+    conn.executemany("INSERT INTO tasks VALUES (?, ?, ?, ?, ?, ?)", (
+      (ts_id, task.task_id, task.params.period, task.params.deadline, task.params.wcet, task.init_time)
+      for task in taskset.tasks
+    ))
+    conn.executemany("INSERT INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", (
+      (ts_id, job.task_id, job.job_id, job.release_time, job.userspace_release_time, job.absolute_deadline, job.completion_time,
+        job.exit_status.name, job.migrations, job.preemptions, job.release_delay, job.response_time, job.exec_time,
+        job.runnable_time, job.first_run_time, job.first_run_cpu, job.wakeup_latency)
+      for job in taskset.jobs
+    ))
+    conn.executemany("INSERT INTO exec_blocks VALUES (?, ?, ?, ?, ?, ?, ?)", (
+      (ts_id, block.task_id, block.job_id, block.cpu_id, block.start_time, block.end_time, block.end_time - block.start_time)
+      for job in taskset.jobs if job.exec_blocks is not None for block in job.exec_blocks
+    ))
+    block_ids = dict((id(block), block_id) for block_id, block in enumerate(taskset.sfunc_blocks))
+    conn.executemany("INSERT INTO sfunc_blocks VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", (
+      (ts_id, block_id, block.name, block.cpu_id, None if block.parent is None else block_ids.get(id(block.parent)),
+        block.nesting, block.entry_time, block.exit_time, block.exit_time - block.entry_time)
+      for block_id, block in enumerate(taskset.sfunc_blocks)
+    ))
+    conn.executemany("INSERT INTO cswitch_blocks VALUES (?, ?, ?, ?, ?, ?, ?, ?)", (
+      (ts_id, block.cpu_id, block.start_time, block.end_time, block.end_time - block.start_time, block.prev_tid, block.next_tid, block.involves_rt)
+      for block in taskset.cswitch_blocks
+    ))
+    conn.executemany("INSERT INTO migrations VALUES (?, ?, ?, ?, ?, ?)", (
+      (ts_id, task.task_id, migration.job_id, migration.time, migration.src_cpu_id, migration.dst_cpu_id)
+      for task in taskset.tasks for migration in task.migrations
+    ))
+    conn.commit()
+
+  # build the indexes and close the database
+  def close(self):
+    for statement in INDEXES:
+      self.conn.execute(statement)
+    self.conn.commit()
+    self.conn.close()
+
+def export_sqlite(tasksets: list[CompletedTaskset], path: str):
+  exporter = SqliteExporter(path)
+  try:
+    for taskset in tasksets:
+      exporter.export_taskset(taskset)
+  finally:
+    exporter.close()
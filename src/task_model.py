@@ -1,10 +1,11 @@
 # classes representing the task model
 
 from enum import Enum
-from utils.args import Args
+from config import Config
+from utils.print_tracker import PrintTracker
 from utils.pretty_time import time2str
-
-import statistics
+from outlier_detector import Anomaly
+from data_quality import DataQuality
 
 # implicit unit of time: nanoseconds
 
@@ -42,9 +43,27 @@ class TaskExecBlock(ExecBlock):
     self.job_id = job_id
     self.cpu_id = cpu_id
 
+# represents a context switch (rcu_utilization "Start/End context switch")
+# rcu notes the context switch at the start of __schedule, so the sched_switch following it
+# on the same cpu (if any, before the next context switch) determines which threads were involved
+class CSwitchBlock(ExecBlock):
+  def __init__(self, cpu_id: int, start_time: int, end_time: int):
+    super().__init__(cpu_id, start_time, end_time)
+
+    self.prev_tid: int | None = None # None if no sched_switch happened during the context switch
+    self.next_tid: int | None = None
+    self.involves_rt = False # switched from or to a task of the taskset
+
+  @property
+  def kind(self) -> str:
+    if self.prev_tid is None:
+      return "no_switch"
+    return "rt" if self.involves_rt else "non_rt"
+
 # represents a single migration
 class Migration:
-  def __init__(self, time: int, src_cpu_id: int, dst_cpu_id: int):
+  def __init__(self, job_id: int, time: int, src_cpu_id: int, dst_cpu_id: int):
+    self.job_id = job_id
     self.time = time
     self.src_cpu_id = src_cpu_id
     self.dst_cpu_id = dst_cpu_id
@@ -67,7 +86,7 @@ class CompletedJob:
     ABORTED = 1 # killed by process due to experiment completion
     DEADLINE_OVERRUN = 2 # scheduler says it missed its deadline
 
-  def __init__(self, task_id: int, job_id: int, release_time: int | None, userspace_release_time: int, absolute_deadline: int, completion_time: int, exit_status: ExitStatus, exec_blocks: list[TaskExecBlock] | None, migrations: int):
+  def __init__(self, task_id: int, job_id: int, release_time: int | None, userspace_release_time: int, absolute_deadline: int, completion_time: int, exit_status: ExitStatus, exec_blocks: list[TaskExecBlock] | None, migrations: int, preemptions: int, exec_time: int, runnable_time: int | None, first_run: tuple[int, int] | None, runnable_waits: list[int], runnable_intervals: list[tuple[int, int, int]] | None):
     self.task_id = task_id
     self.job_id = job_id
     self.release_time = release_time
@@ -77,13 +96,26 @@ class CompletedJob:
     self.exec_blocks = exec_blocks
     self.exit_status = exit_status
     self.migrations = migrations
+    self.preemptions = preemptions
+    self.exec_time = exec_time # time spent executing between release and completion
+    self.runnable_time = runnable_time # when the job became runnable (wakeup, else release time)
+    self.first_run_time = None if first_run is None else first_run[0] # when the job was first switched in
+    self.first_run_cpu = -1 if first_run is None else first_run[1]
+    self.runnable_waits = runnable_waits # time spent runnable but not running after each preemption or wakeup within the job
+    # (start, end, cpu id switched in on or -1) of every interval the job was runnable but not running, including
+    # the wait before its first run (None if exec blocks were not kept)
+    self.runnable_intervals = runnable_intervals
 
     self.release_delay = None if release_time is None else userspace_release_time - release_time
+    self.response_time = completion_time - (userspace_release_time if release_time is None else release_time)
+    self.wakeup_latency = None if runnable_time is None or self.first_run_time is None else self.first_run_time - runnable_time
 
 # represents the execution state of a task at a specific point in time
 # also records completed jobs
 class Task:
-  def __init__(self, task_id: int, params: TaskParams, init_time: int, cpu_id: int):
+  def __init__(self, task_id: int, params: TaskParams, init_time: int, cpu_id: int, config: Config, printer: PrintTracker):
+    self.config = config
+    self.printer = printer
     self.init_time = init_time
     self.task_id = task_id
     self.params = params
@@ -93,14 +125,25 @@ class Task:
     self.is_completed = True # current job completed or no job released?
     self.migrations: list[Migration] = [] # migrations across all jobs
     self.job_migrations = 0 # migrations associated to current job
+    self.pending_migrations = 0 # migrations while waiting for the next job (e.g. when woken up on another cpu)
+    self.job_preemptions = 0 # times the current job was switched out before completing
+    self.job_exec_time = 0 # execution time of the current job up to its last preemption
     self.release_time = 0
     self.exec_start_time = 0
-    self.exec_blocks: list[TaskExecBlock] | None = [] if Args.render else None
+    self.exec_blocks: list[TaskExecBlock] | None = [] if config.keep_exec_blocks else None
     self.completed_jobs: list[CompletedJob] = []
     self.absolute_deadline = 0
+    self.wakeup_time: int | None = None # first wakeup while waiting for the next job
+    self.switch_ins: list[tuple[int, int]] = [] # (time, cpu id) of switch ins while waiting for the next job
+    self.job_runnable_time: int | None = None
+    self.job_first_run: tuple[int, int] | None = None
+    self.runnable_since: int | None = None # time the current job became runnable again while not running
+    self.job_runnable_waits: list[int] = []
+    self.job_runnable_intervals: list[tuple[int, int, int]] | None = [] if config.keep_exec_blocks else None
+    self.sched_class: str | None = None # scheduler class from the priority the task was last switched in with (None if unknown)
     if cpu_id != -1:
       self.execute(init_time, cpu_id)
-    if Args.verbose: print(f"{self}: init")
+    if config.verbose: printer.print(f"{self}: init")
 
   def __str__(self):
     return f"T{self.task_id}{self.params}"
@@ -111,10 +154,22 @@ class Task:
   # release time: hrtimer_cancel time
   # userspace_release_time: when task_proc's job_release tracepoint is emitted
   def release(self, release_time: int | None, userspace_release_time: int, cpu_id: int) -> None:
-    if Args.verbose: print(f"{self}: release({release_time}, {userspace_release_time}, {cpu_id})")
+    if self.config.verbose: self.printer.print(f"{self}: release({release_time}, {userspace_release_time}, {cpu_id})")
     if not self.is_completed:
       raise Exception(f"[{userspace_release_time}ns]: Task {self.task_id} released new job before old job completed (old job id: {self.job_id})")
     
+    # the job became runnable at its wakeup (if it slept) or at its release, and first ran at the next switch in
+    self.job_runnable_time = self.wakeup_time if self.wakeup_time is not None else release_time
+    self.job_first_run = next((switch_in for switch_in in self.switch_ins if self.job_runnable_time is None or switch_in[0] >= self.job_runnable_time), None)
+    self.wakeup_time = None
+    self.switch_ins = []
+    self.runnable_since = None
+    self.job_runnable_waits = []
+    if self.job_runnable_intervals is not None:
+      self.job_runnable_intervals = []
+      if self.job_runnable_time is not None and self.job_first_run is not None:
+        self.job_runnable_intervals.append((self.job_runnable_time, *self.job_first_run))
+
     self.job_id += 1
     self.is_executing = False
     self.cpu_id = -1
@@ -123,44 +178,75 @@ class Task:
     self.userspace_release_time = userspace_release_time
     self.absolute_deadline = (userspace_release_time if release_time is None else release_time) + self.params.deadline
     self.exec_start_time = 0
-    self.job_migrations = 0
+    self.job_migrations = self.pending_migrations
+    self.pending_migrations = 0
+    self.job_preemptions = 0
+    self.job_exec_time = 0
     if self.exec_blocks is not None:
       self.exec_blocks = []
     if cpu_id != -1:
       self.execute(userspace_release_time, cpu_id)
 
   def migrate(self, time: int, src_cpu_id: int, dst_cpu_id: int):
-    if Args.verbose: print(f"{self}: migrate({time}, {src_cpu_id}, {dst_cpu_id})")
+    if self.config.verbose: self.printer.print(f"{self}: migrate({time}, {src_cpu_id}, {dst_cpu_id})")
     if self.is_executing:
       raise Exception(f"[{time2str(time)}]: Task {self.task_id} cannot migrate while running (job id: {self.job_id})")
     if self.cpu_id not in [-1, src_cpu_id]:
       raise Exception(f"[{time2str(time)}]: Task {self.task_id} is not on the cpu it's migrating from (job id: {self.job_id})")
     
-    self.migrations.append(Migration(time, src_cpu_id, dst_cpu_id))
-    self.job_migrations += 1
+    # migrations between jobs belong to the next job
+    if self.is_completed:
+      self.migrations.append(Migration(self.job_id + 1, time, src_cpu_id, dst_cpu_id))
+      self.pending_migrations += 1
+    else:
+      self.migrations.append(Migration(self.job_id, time, src_cpu_id, dst_cpu_id))
+      self.job_migrations += 1
     self.cpu_id = dst_cpu_id
 
   def execute(self, time: int, cpu_id: int) -> None:
-    if Args.verbose: print(f"{self}: execute({time}, {cpu_id})")
+    if self.config.verbose: self.printer.print(f"{self}: execute({time}, {cpu_id})")
     if self.is_executing:
       raise Exception(f"[{time2str(time)}]: Task {self.task_id} is already running (job id: {self.job_id})")
     if self.cpu_id not in [-1, cpu_id]:
       raise Exception(f"[{time2str(time)}]: Task {self.task_id} on cpu{self.cpu_id} cannot execute on cpu{cpu_id} (job id: {self.job_id})")
 
+    if self.is_completed:
+      self.switch_ins.append((time, cpu_id))
+    elif self.runnable_since is not None:
+      self.job_runnable_waits.append(time - self.runnable_since)
+      if self.job_runnable_intervals is not None: self.job_runnable_intervals.append((self.runnable_since, time, cpu_id))
+    self.runnable_since = None
+
     self.last_cpu_id = cpu_id
     self.is_executing = True
     self.exec_start_time = time
 
-  def preempt(self, time: int) -> None:
-    if Args.verbose: print(f"{self}: preempt({time})")
+  # runnable: the task was switched out while still runnable (as opposed to blocking)
+  def preempt(self, time: int, runnable: bool = False) -> None:
+    if self.config.verbose: self.printer.print(f"{self}: preempt({time}, {runnable})")
     if not self.is_executing:
       raise Exception(f"[{time2str(time)}]: Task {self.task_id} is already preempted (job id: {self.job_id})")
     
     self.is_executing = False
+    if not self.is_completed:
+      self.job_preemptions += 1
+      self.job_exec_time += time - self.exec_start_time
+      if runnable:
+        self.runnable_since = time
     if self.exec_blocks is not None: self.exec_blocks.append(TaskExecBlock(self.task_id, self.job_id, self.last_cpu_id, self.exec_start_time, time))
 
+  def wakeup(self, time: int) -> None:
+    if self.config.verbose: self.printer.print(f"{self}: wakeup({time})")
+    if self.is_executing:
+      return
+    if self.is_completed:
+      if self.wakeup_time is None:
+        self.wakeup_time = time
+    elif self.runnable_since is None:
+      self.runnable_since = time
+
   def complete(self, time: int) -> None:
-    if Args.verbose: print(f"{self}: complete({time})")
+    if self.config.verbose: self.printer.print(f"{self}: complete({time})")
     if self.job_id == -1:
       raise Exception(f"[{time2str(time)}]: Task {self.task_id} has not released any jobs")
     if self.is_completed:
@@ -174,26 +260,41 @@ class Task:
       self.release_time, self.userspace_release_time, self.absolute_deadline, time,
       CompletedJob.ExitStatus.SUCCESS,
       self.exec_blocks,
-      self.job_migrations
+      self.job_migrations,
+      self.job_preemptions,
+      self.job_exec_time + (time - self.exec_start_time if self.is_executing else 0),
+      self.job_runnable_time,
+      self.job_first_run,
+      self.job_runnable_waits,
+      self.job_runnable_intervals
     ))
 
   def abort(self, time: int, is_deadline_overrun: bool) -> None:
-    if Args.verbose: print(f"{self}: abort({time}, {is_deadline_overrun})")
+    if self.config.verbose: self.printer.print(f"{self}: abort({time}, {is_deadline_overrun})")
     if self.is_completed:
       # if overrun, retroactively set the previous job to be an overrun
       if is_deadline_overrun and len(self.completed_jobs) > 0:
         self.completed_jobs[-1].exit_status = CompletedJob.ExitStatus.DEADLINE_OVERRUN
       return
     
+    preemptions = self.job_preemptions
     if self.is_executing:
       self.preempt(time)
+    elif self.runnable_since is not None and self.job_runnable_intervals is not None:
+      self.job_runnable_intervals.append((self.runnable_since, time, -1)) # still waiting when aborted
     
     self.completed_jobs.append(CompletedJob(
       self.task_id, self.job_id,
       self.release_time, self.userspace_release_time, self.absolute_deadline, time,
       CompletedJob.ExitStatus.DEADLINE_OVERRUN if is_deadline_overrun else CompletedJob.ExitStatus.ABORTED,
       self.exec_blocks,
-      self.job_migrations
+      self.job_migrations,
+      preemptions,
+      self.job_exec_time,
+      self.job_runnable_time,
+      self.job_first_run,
+      self.job_runnable_waits,
+      self.job_runnable_intervals
     ))
     self.is_executing = False
     self.is_completed = True
@@ -206,46 +307,66 @@ class CPUState:
     self.cpu_id = cpu_id
     self.curr_tid = -1 # current running task
     self.prev_tid = -1 # last running task
-    self.active_cswitch_block = None
-    self.cswitch_blocks: list[ExecBlock] = [] # completed cswitch blocks
+    self.active_cswitch_block: CSwitchBlock | None = None
+    self.pending_cswitch_block: CSwitchBlock | None = None # last completed cswitch block not yet followed by a sched_switch
+    self.cswitch_blocks: list[CSwitchBlock] = [] # completed cswitch blocks
+    self.idle_blocks: list[ExecBlock] = [] # completed intervals running the swapper task (tid=0)
     self.sfunc_stack: list[SFuncBlock] = [] # scheduler function stack
     self.sfunc_blocks: list[SFuncBlock] = [] # completed function blocks
+    self.has_lost_events = False # the tracer dropped kernel events of this cpu in the current taskset (sfunc exits may be unmatched)
   
   def switch(self, tid: int, time: int):
+    if self.curr_tid == 0 and tid != 0:
+      self.idle_blocks.append(ExecBlock(self.cpu_id, self.last_switch_time, time))
     self.prev_tid, self.curr_tid = self.curr_tid, tid
     self.last_switch_time = time
 
   def cswitch_start(self, time: int):
-    # if Args.verbose: print(f"{self}: cswitch_start({time})")
     if self.active_cswitch_block is not None:
       raise Exception("CPU already context switching")
     
-    self.active_cswitch_block = ExecBlock(self.cpu_id, time, -1)
+    self.active_cswitch_block = CSwitchBlock(self.cpu_id, time, -1)
+    self.pending_cswitch_block = None
   
-  def cswitch_end(self, time: int):
-    # if Args.verbose: print(f"{self}: cswitch_end({time})")
+  def cswitch_end(self, time: int) -> CSwitchBlock | None:
     cswitch_block = self.active_cswitch_block
     if cswitch_block is None:
-      return # switch_start happened before tracing started
+      return None # switch_start happened before tracing started
     
     self.active_cswitch_block = None
+    self.pending_cswitch_block = cswitch_block
     cswitch_block.end_time = time
     self.cswitch_blocks.append(cswitch_block)
+    return cswitch_block
 
   def sfunc_entry(self, name: str, time: int):
-    # if Args.verbose: print(f"{self}: sfunc_entry({name}, {time})")
     parent = None if len(self.sfunc_stack) == 0 else self.sfunc_stack[-1]
     self.sfunc_stack.append(SFuncBlock(name, self.cpu_id, parent, len(self.sfunc_stack), time, -1))
   
-  def sfunc_exit(self, name: str, time: int):
-    # if Args.verbose: print(f"{self}: sfunc_exit({name}, {time})")
+  # returns None if the exit can't be matched after lost events
+  def sfunc_exit(self, name: str, time: int) -> SFuncBlock | None:
     if len(self.sfunc_stack) == 0 or self.sfunc_stack[-1].name != name:
-      stack_dump = ", ".join(sfunc.name for sfunc in self.sfunc_stack)
-      raise Exception(f"CPU sched func stack mismatch: stack is [{stack_dump}] but {name} exited")
+      if self.has_lost_events and any(sfunc.name == name for sfunc in self.sfunc_stack):
+        # the exits of the functions above it were lost, drop them
+        while self.sfunc_stack[-1].name != name:
+          self.sfunc_stack.pop()
+      elif self.has_lost_events:
+        return None # entered before the lost events, or its entry was lost
+      else:
+        stack_dump = ", ".join(sfunc.name for sfunc in self.sfunc_stack)
+        raise Exception(f"CPU sched func stack mismatch: stack is [{stack_dump}] but {name} exited")
     
     sfunc_block = self.sfunc_stack.pop()
     sfunc_block.exit_time = time
     self.sfunc_blocks.append(sfunc_block)
+    return sfunc_block
+
+  # the tracer dropped events of this cpu: the blocks in progress would span the gap, so they are dropped
+  def lose_events(self):
+    self.has_lost_events = True
+    self.sfunc_stack = []
+    self.active_cswitch_block = None
+    self.pending_cswitch_block = None
 
   def __str__(self):
     return f"CPU{self.cpu_id}"
@@ -259,8 +380,13 @@ class ExecData:
 
   def update(self):
     self.count = len(self.durations)
-    self.mean_runtime = statistics.mean(self.durations) if len(self.durations) > 0 else -1
-    self.median_runtime = statistics.median(self.durations) if len(self.durations) > 0 else -1
+    # computed by hand since importing statistics is slow relative to a short parse
+    self.mean_runtime = sum(self.durations) / self.count if self.count > 0 else -1
+    self.median_runtime = -1
+    if self.count > 0:
+      durations = sorted(self.durations)
+      mid = self.count // 2
+      self.median_runtime = durations[mid] if self.count % 2 == 1 else (durations[mid - 1] + durations[mid]) / 2
     self.max_runtime = max(self.durations) if len(self.durations) > 0 else -1
     self.min_runtime = min(self.durations) if len(self.durations) > 0 else -1
 
@@ -279,15 +405,42 @@ class SFuncData(ExecData):
 
 # represents a completed taskset
 class CompletedTaskset:
-  def __init__(self, tasks: list[Task], exec_data: dict[str, ExecData], cswitch_blocks: list[ExecBlock], init_time: int, completion_time: int):
+  def __init__(self, taskset_id: int, tasks: list[Task], exec_data: dict[str, ExecData], cswitch_blocks: list[CSwitchBlock], idle_blocks: list[ExecBlock], anomalies: list[Anomaly], quality: DataQuality, init_time: int, completion_time: int):
+    self.taskset_id = taskset_id
     self.tasks = tasks
     self.exec_data = exec_data
     self.sfunc_blocks = [ sfunc_block for data in exec_data.values() if isinstance(data, SFuncData) for sfunc_block in data.blocks ]
     self.sfunc_blocks.sort(key = lambda sfunc_block : sfunc_block.entry_time)
     self.cswitch_blocks = cswitch_blocks
+    self.idle_blocks = idle_blocks # cpu idle intervals clipped to the taskset
+    self.anomalies = anomalies # top outliers found while tracking (by decreasing score)
+    self.quality = quality # events received and lost by the tracer during the taskset
     self.jobs: list[CompletedJob] = [ job for task in tasks for job in task.completed_jobs ]
     self.jobs.sort(key = lambda job : job.userspace_release_time)
     self.init_time = init_time
     self.completion_time = completion_time
     self.cpu_ids = list(set([ sfunc_block.cpu_id for sfunc_block in self.sfunc_blocks ] + [ exec_block.cpu_id for task in tasks for job in task.completed_jobs if job.exec_blocks is not None for exec_block in job.exec_blocks ]))
-  
\ No newline at end of file
+
+# represents a taskset discarded in lenient mode due to an inconsistency in the trace
+# taskset_id is None if the error happened between tasksets
+class QuarantinedTaskset:
+  def __init__(self, taskset_id: int | None, init_time: int, error_time: int, event_name: str, cpu_id: int, message: str, recent_events: list[tuple[int, str]]):
+    self.taskset_id = taskset_id
+    self.init_time = init_time
+    self.error_time = error_time
+    self.event_name = event_name
+    self.cpu_id = cpu_id
+    self.message = message
+    self.recent_events = recent_events # (time, event name) leading up to the error
+    self.errors = 1 # errors raised until resynchronization (including the first)
+    self.resync_time: int | None = None # time of the taskset_init that ended the quarantine
+
+  def __str__(self):
+    name = "between tasksets" if self.taskset_id is None else f"taskset {self.taskset_id}"
+    res = [ f" - {name}: [{time2str(self.error_time)}] {self.event_name} (cpu{self.cpu_id}): {self.message}" ]
+    resync = "never" if self.resync_time is None else f"at [{time2str(self.resync_time)}]"
+    res.append(f"     errors while quarantined: {self.errors}, resynchronized {resync}")
+    res.append("     recent events:")
+    for time, event_name in self.recent_events:
+      res.append(f"       [{time2str(time)}] {event_name}")
+    return "\n".join(res)
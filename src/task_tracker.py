@@ -1,14 +1,36 @@
 # task tracking logic
 
 from task_model import *
-from sched_class_funcs import *
-from visualizer import render
+from sched_profiles import SchedClassProfile, PROFILES_BY_NAME, PROFILE_FUNCS, select_profiles, sched_class_of_prio
 from utils.pretty_time import time2str
-from utils.args import Args
+from utils.print_tracker import PrintTracker
+from config import Config
+from outlier_detector import OutlierDetector
+from data_quality import DataQuality
+
+from collections import deque
+from typing import Callable
+
+RECENT_EVENTS_CONTEXT = 16 # number of events leading up to an error recorded in lenient mode
+# sched_switch prev_state of a preempted thread (reported as "R+" since linux 4.14, older kernels and tracers report 0)
+TASK_REPORT_MAX = 0x100
+
+# context switch durations by kind (whether a taskset task was switched from/to) and by cpu
+def cswitch_durations(cswitch_blocks: list[CSwitchBlock]) -> dict[str, list[int]]:
+  durations: dict[str, list[int]] = {}
+  for block in cswitch_blocks:
+    duration = block.end_time - block.start_time
+    for name in [ "cswitch:all", f"cswitch:{block.kind}", f"cswitch:cpu{block.cpu_id}" ]:
+      durations.setdefault(name, []).append(duration)
+  return durations
 
 # represents the execution state of a taskset at a specific point in time
 class TaskTracker:
-  def __init__(self):
+  def __init__(self, config: Config | None = None):
+    self.config = config if config is not None else Config()
+    self.printer = PrintTracker()
+    self.parsed_msgs = 0 # progress display bookkeeping
+    self.next_progress_update = 0.0
     self.time = -1
     self.tasks: list[Task] = []
     self.id_map: dict[int, int] = {} # tid (thread id) -> task id
@@ -20,6 +42,26 @@ class TaskTracker:
     self.cpus: dict[int, CPUState] = {} # cpu id -> cpu state
     self.sleep_timers: dict[int, Task] = {} # hrtimer -> task
     self.unhandled_releases: dict[int, int] = {} # task id -> release time (based on hrtimer cancel) of releases yet to have associated job_release (used to track release delay)
+    self.lenient = self.config.lenient # quarantine tasksets on errors instead of aborting
+    self.quarantined_tasksets: list[QuarantinedTaskset] = []
+    self.active_quarantine: QuarantinedTaskset | None = None # set until the next taskset_init
+    self.recent_events: deque[tuple[int, str]] = deque(maxlen=RECENT_EVENTS_CONTEXT) # only filled in lenient mode
+    self.taskset_listeners: list[Callable[[CompletedTaskset], None]] = [] # called with each taskset as it completes
+    # scheduler classes whose functions and release timers are tracked (may be narrowed down from the trace metadata)
+    self.set_profiles(select_profiles(None))
+    if self.config.sched_classes is not None:
+      unknown = [ name for name in self.config.sched_classes if name not in PROFILES_BY_NAME ]
+      if len(unknown) > 0:
+        raise Exception(f"Unknown scheduler classes: {', '.join(unknown)} (known: {', '.join(PROFILES_BY_NAME)})")
+      self.set_profiles([ PROFILES_BY_NAME[name] for name in self.config.sched_classes ])
+    self.detector = OutlierDetector(self.config.outliers, self.config.outlier_threshold) if self.config.outliers > 0 else None
+    self.quality = DataQuality(-1, False) # events received and lost since the current taskset started (or between tasksets)
+
+  # functions of the other classes are ignored, and release timers are only matched against the class of their task
+  def set_profiles(self, profiles: list[SchedClassProfile]):
+    self.profiles = profiles
+    self.profiles_by_name: dict[str, SchedClassProfile] = dict((profile.name, profile) for profile in profiles)
+    self.untracked_sfuncs: set[str] = set(PROFILE_FUNCS).difference(func for profile in profiles for func in profile.funcs)
 
   def set_time(self, time):
     if time < self.time:
@@ -40,23 +82,36 @@ class TaskTracker:
     return self.cpus[cpu_id]
 
   def new_taskset(self):
+    error = None
     if not self.is_complete:
-      raise Exception(f"[{time2str(self.time)}]: Cannot create new taskset when current one is not complete (current taskset: {self.taskset_id})")
-    if len(self.sleep_timers) > 0:
-      raise Exception(f"[{time2str(self.time)}]: Cannot create new taskset when sleep timers are not all handled (current taskset: {self.taskset_id}, sleep_timers={self.sleep_timers})")
-    
+      error = Exception(f"[{time2str(self.time)}]: Cannot create new taskset when current one is not complete (current taskset: {self.taskset_id})")
+    elif len(self.sleep_timers) > 0:
+      error = Exception(f"[{time2str(self.time)}]: Cannot create new taskset when sleep timers are not all handled (current taskset: {self.taskset_id}, sleep_timers={self.sleep_timers})")
+    if error is not None:
+      if not self.lenient:
+        raise error
+      # the previous taskset lost its end (e.g. kill_threads or a timer cancel): quarantine it and resynchronize right
+      # here, so the taskset started by this taskset_init is kept
+      self.quarantine(error, "task_proc:taskset_init", -1)
+
+    if self.active_quarantine is not None:
+      self.active_quarantine.resync_time = self.time
+      self.active_quarantine = None
+
     self.unhandled_releases = {}
     self.taskset_id += 1
     self.tasks = []
     self.id_map = {}
     self.is_complete = False
     self.taskset_init_time = self.time
+    self.quality = DataQuality(self.time, True)
+    # unmatched sfunc exits are only tolerated in the taskset the events were lost in
+    for cpu in self.cpus.values():
+      cpu.has_lost_events = False
 
   def complete_taskset(self):
     if self.is_complete:
       raise Exception(f"[{time2str(self.time)}]: No active taskset (last taskset: {self.taskset_id})")
-    
-    self.is_complete = True
 
     # abort any running tasks
     for task in self.tasks:
@@ -65,7 +120,8 @@ class TaskTracker:
     # filter the exec blocks for those generated for the tasks in the taskset
     # order by start time
     sfunc_blocks: list[SFuncBlock] = []
-    cswitch_blocks: list[ExecBlock] = []
+    cswitch_blocks: list[CSwitchBlock] = []
+    idle_blocks: list[ExecBlock] = []
     for cpu in self.cpus.values():
       # add sfunc blocks
       for i in range(len(cpu.sfunc_blocks)-1, -1, -1):
@@ -83,8 +139,19 @@ class TaskTracker:
 
         cswitch_blocks.append(cswitch_block)
 
+      # add idle blocks (clipped to the taskset, including the ongoing one)
+      if cpu.curr_tid == 0:
+        idle_blocks.append(ExecBlock(cpu.cpu_id, max(cpu.last_switch_time, self.taskset_init_time), self.time))
+      for i in range(len(cpu.idle_blocks)-1, -1, -1):
+        idle_block = cpu.idle_blocks[i]
+        if idle_block.end_time <= self.taskset_init_time:
+          break
+
+        idle_blocks.append(ExecBlock(cpu.cpu_id, max(idle_block.start_time, self.taskset_init_time), idle_block.end_time))
+
     sfunc_blocks.sort(key=lambda b : b.entry_time )
     cswitch_blocks.sort(key=lambda b : b.start_time )
+    idle_blocks.sort(key=lambda b : b.start_time )
 
     sfunc_map: dict[str, list[SFuncBlock]] = {}
     for sf in sfunc_blocks:
@@ -96,33 +163,70 @@ class TaskTracker:
       data = SFuncData(name, blocks)
       exec_data[data.name] = data
     jobs = [ job for task in self.tasks for job in task.completed_jobs ]
+    for profile in self.profiles:
+      for role, funcs in [ ("pick", profile.pick_funcs), ("enqueue", profile.enqueue_funcs) ]:
+        durations = [ duration for func in funcs if f"sfunc:{func}" in exec_data for duration in exec_data[f"sfunc:{func}"].durations ]
+        if len(durations) > 0:
+          exec_data[f"{role}:{profile.name}"] = ExecData(f"{role}:{profile.name}", durations)
     exec_data["job:release_delay"] = ExecData("job:release_delay", [ job.release_delay for job in jobs if job.release_delay is not None ])
     exec_data["job:migrations"] = ExecData("job:migrations", [ job.migrations for job in jobs ])
-    exec_data["job:preemptions"] = ExecData("job:preemptions", [ len(job.exec_blocks) - 1 for job in jobs ])
-
-    taskset = CompletedTaskset(self.tasks, exec_data, cswitch_blocks, self.taskset_init_time, self.time)
+    exec_data["job:preemptions"] = ExecData("job:preemptions", [ job.preemptions for job in jobs ])
+    for name, durations in cswitch_durations(cswitch_blocks).items():
+      exec_data[name] = ExecData(name, durations)
+    exec_data["job:wakeup_latency"] = ExecData("job:wakeup_latency", [ job.wakeup_latency for job in jobs if job.wakeup_latency is not None ])
+    exec_data["job:preempted_wait"] = ExecData("job:preempted_wait", [ wait for job in jobs for wait in job.runnable_waits ])
+    exec_data["job:response_time"] = ExecData("job:response_time", [ job.response_time for job in jobs if job.exit_status != CompletedJob.ExitStatus.ABORTED ])
+
+    anomalies = self.detector.take_anomalies() if self.detector is not None else []
+    quality = self.quality
+    quality.end_time = self.time
+    self.quality = DataQuality(self.time, False)
+    taskset = CompletedTaskset(self.taskset_id, self.tasks, exec_data, cswitch_blocks, idle_blocks, anomalies, quality, self.taskset_init_time, self.time)
     self.completed_tasksets.append(taskset)
+    self.is_complete = True
+    for listener in self.taskset_listeners:
+      listener(taskset)
+
+  # lenient mode: discard the current taskset after an error and ignore its events until the next taskset_init
+  # (taskset ids keep counting the quarantined tasksets, so they match the order of the tasksets in the trace)
+  def quarantine(self, error: Exception, event_name: str, cpu_id: int):
+    if self.active_quarantine is not None:
+      self.active_quarantine.errors += 1
+    else:
+      if self.config.verbose: self.printer.print(f"[{time2str(self.time)}]: quarantining taskset {self.taskset_id} ({event_name}: {error})")
+      self.active_quarantine = QuarantinedTaskset(
+        None if self.is_complete else self.taskset_id,
+        self.taskset_init_time, self.time, event_name, cpu_id, str(error), list(self.recent_events)
+      )
+      self.quarantined_tasksets.append(self.active_quarantine)
+
+    # drop all state that may be inconsistent
+    if self.detector is not None:
+      self.detector.take_anomalies()
+    self.quality = DataQuality(self.time, False)
+    self.is_complete = True
+    self.tasks = []
+    self.id_map = {}
+    self.sleep_timers = {}
+    self.unhandled_releases = {}
+    for cpu in self.cpus.values():
+      cpu.sfunc_stack = []
+      cpu.active_cswitch_block = None
+      cpu.pending_cswitch_block = None
 
   # output completed tasksets
   def output(self):
-    # output exec data
-    combined_exec_data: dict[str, ExecData] = {}
-    for i, ts in enumerate(self.completed_tasksets):
-      exec_data = ts.exec_data
-      for data in exec_data.values():
-        if data.name in combined_exec_data:
-          combined_exec_data[data.name].extend(data)
-        else:
-          combined_exec_data[data.name] = data
-      with open(f"{Args.output_path}/taskset_{i}_stats.txt", "w") as file:
-        file.write(self.exec_data_str(exec_data))
-    with open(f"{Args.output_path}/combined_taskset_stats.txt", "w") as file:
-      file.write(self.exec_data_str(combined_exec_data))
-
-    # output visualizations
-    if Args.render:
-      for i, taskset in enumerate(self.completed_tasksets):
-          render(taskset, f"{Args.output_path}/taskset_{i}.svg")
+    from output_writer import write_output
+    write_output(self.completed_tasksets, self.quarantined_tasksets, self.config)
+
+  # jobs of the taskset in progress as (task id, job id, cpu id, is executing, absolute deadline)
+  def concurrent_jobs(self) -> list[tuple[int, int, int, bool, int]]:
+    return [ (task.task_id, task.job_id, task.cpu_id, task.is_executing, task.absolute_deadline) for task in self.tasks if not task.is_completed ]
+
+  # feed an occurrence of a metric to the outlier detector
+  def observe(self, metric: str, value: int, cpu_id: int):
+    if self.detector is not None:
+      self.detector.observe(metric, value, self.time, cpu_id, None if self.is_complete else self.concurrent_jobs)
 
   def get_task(self, tid) -> Task | None:
     if self.is_complete:
@@ -137,29 +241,40 @@ class TaskTracker:
     if tid in self.id_map:
       raise Exception(f"[{time2str(self.time)}]: Multiple tasks mapped to same thread (tid={tid}):\n    existing task: {self.get_task(tid).params}\n    incoming task: {params}")
     
-    self.tasks.append(Task(len(self.tasks), params, self.time, self.get_thread_cpu_id(tid)))
+    self.tasks.append(Task(len(self.tasks), params, self.time, self.get_thread_cpu_id(tid), self.config, self.printer))
     self.id_map[tid] = self.tasks[-1].task_id
     
-    if Args.verbose: print(f"tid={tid} mapped to task {self.tasks[-1]}")
+    if self.config.verbose: self.printer.print(f"tid={tid} mapped to task {self.tasks[-1]}")
 
-  def switch(self, cpu_id: int, prev_tid: int, next_tid: int):
+  # prev_state: state of the previous thread (0 or TASK_REPORT_MAX if it is still runnable, i.e. preempted)
+  # next_prio: priority of the next thread as reported by sched_switch (None if unknown)
+  def switch(self, cpu_id: int, prev_tid: int, next_tid: int, prev_state: int = 0, next_prio: int | None = None):
     cpu = self.get_cpu(cpu_id)
     cpu.switch(next_tid, self.time)
     if cpu.prev_tid != prev_tid and cpu.prev_tid != -1:
       # can occur with kernel preemption and swapper shenanigans
-      if Args.verbose: print(f"[{time2str(self.time)}]: CPU marked as running tid={cpu.prev_tid} but switch indicates should be running {prev_tid}")
+      if self.config.verbose: self.printer.print(f"[{time2str(self.time)}]: CPU marked as running tid={cpu.prev_tid} but switch indicates should be running {prev_tid}")
     
     prev_task = self.get_task(prev_tid)
     if prev_task is not None:
-      prev_task.preempt(self.time)
+      prev_task.preempt(self.time, prev_state == 0 or prev_state & TASK_REPORT_MAX != 0)
     if prev_tid in self.thread_cpu:
       del self.thread_cpu[prev_tid]
 
     next_task = self.get_task(next_tid)
     if next_task is not None:
+      if next_prio is not None:
+        next_task.sched_class = sched_class_of_prio(next_prio)
       next_task.execute(self.time, cpu_id)
     self.thread_cpu[next_tid] = cpu_id
 
+    cswitch_block = cpu.active_cswitch_block or cpu.pending_cswitch_block
+    cpu.pending_cswitch_block = None
+    if cswitch_block is not None:
+      cswitch_block.prev_tid = prev_tid
+      cswitch_block.next_tid = next_tid
+      cswitch_block.involves_rt = prev_task is not None or next_task is not None
+
   def release(self, tid: int):
     task = self.get_task(tid)
     cpu_id = self.get_thread_cpu_id(tid)
@@ -171,28 +286,47 @@ class TaskTracker:
       if task.task_id not in self.unhandled_releases:
         # this can occur in a valid way when the task completes at or after its deadline, which results in sleep_until being a no-op.
         # for analysis, we ignore this for release delay calculations since the scheduler never releases the thread
-        if Args.verbose: print(f"[{time2str(self.time)}]: Could not find task's release time (task={task}, job=J{task.job_id+1})")
+        if self.config.verbose: self.printer.print(f"[{time2str(self.time)}]: Could not find task's release time (task={task}, job=J{task.job_id+1})")
       else:
         release_time = self.unhandled_releases[task.task_id]
         del self.unhandled_releases[task.task_id]
 
     task.release(release_time, self.time, cpu_id)
 
+  def wakeup(self, tid: int):
+    task = self.get_task(tid)
+    if task is not None:
+      task.wakeup(self.time)
+
   def complete(self, tid):
     task = self.get_task(tid)
     task.complete(self.time)
+    if self.detector is not None:
+      job = task.completed_jobs[-1]
+      self.observe("job:response_time", job.response_time, task.last_cpu_id)
+      self.observe("job:exec_time", job.exec_time, task.last_cpu_id)
+      if job.wakeup_latency is not None:
+        self.observe("job:wakeup_latency", job.wakeup_latency, task.last_cpu_id)
+      if job.release_delay is not None:
+        self.observe("job:release_delay", job.release_delay, task.last_cpu_id)
 
   def deadline_overrun(self, tid: int):
     task = self.get_task(tid)
     task.abort(self.time, True)
 
   def sfunc_entry(self, name: str, cpu_id: int):
+    if name in self.untracked_sfuncs:
+      return
     cpu = self.get_cpu(cpu_id)
     cpu.sfunc_entry(name, self.time)
 
   def sfunc_exit(self, name: str, cpu_id: int):
+    if name in self.untracked_sfuncs:
+      return
     cpu = self.get_cpu(cpu_id)
-    cpu.sfunc_exit(name, self.time)
+    block = cpu.sfunc_exit(name, self.time)
+    if block is not None:
+      self.observe(f"sfunc:{name}", block.exit_time - block.entry_time, cpu_id)
 
   def cswitch_start(self, cpu_id: int):
     cpu = self.get_cpu(cpu_id)
@@ -200,7 +334,26 @@ class TaskTracker:
 
   def cswitch_end(self, cpu_id: int):
     cpu = self.get_cpu(cpu_id)
-    cpu.cswitch_end(self.time)
+    block = cpu.cswitch_end(self.time)
+    if block is not None:
+      self.observe("cswitch:all", block.end_time - block.start_time, cpu_id)
+
+  # every event received, before its handler: the single per-event bookkeeping pass, counting it in the data quality of
+  # the window and keeping it as context of the cpu's anomalies (if detected)
+  def record_event(self, cpu_id: int, name: str):
+    self.quality.record_event(cpu_id)
+    if self.detector is not None:
+      self.detector.record_event(cpu_id, self.time, name)
+
+  # events lost by the tracer between begin_time and end_time (cpu_id=-1 if the cpu is unknown)
+  #   kernel: lost from a kernel stream (userspace losses don't affect the cpu's scheduler state)
+  def lose_events(self, cpu_id: int, lost_events: int, lost_packets: int, begin_time: int, end_time: int, kernel: bool = True):
+    if self.config.verbose: self.printer.print(f"[{time2str(begin_time)} -> {time2str(end_time)}]: cpu{cpu_id} lost {lost_events} {'kernel' if kernel else 'userspace'} events, {lost_packets} packets")
+    self.quality.record_discarded(cpu_id, lost_events, lost_packets, begin_time, end_time)
+    if not kernel:
+      return
+    for cpu in (self.cpus.values() if cpu_id == -1 else [ self.get_cpu(cpu_id) ]):
+      cpu.lose_events()
 
   def migrate(self, tid: int, src_cpu_id: int, dst_cpu_id: int):
     task = self.get_task(tid)
@@ -221,37 +374,14 @@ class TaskTracker:
     cpu = self.get_cpu(cpu_id)
     task = self.get_task(cpu.curr_tid)
 
-    if mode == 8 and len(cpu.sfunc_stack) > 0 and cpu.sfunc_stack[-1].name == "yield_task_dl":
-      # handle sched_deadline timers
-      # we know the scheduler's hrtimer is triggered when the sfunc stack has yield_task_dl on top
-      # for this one, mode=8 since the kernel is managing it
-      if task is None:
-        raise Exception(f"[{time2str(self.time)}]: Could not find task mapped to sched_yield's htimer start (hrtimer={hex(hrtimer)}, tid={cpu.curr_tid})")
-      self.sleep_timers[hrtimer] = task
-    if mode == 1 and task is not None and task.is_completed and task.job_id != -1:
-      # handle sched_ext timers
-      # we know simulate_tasks' sleep_until hrtimer is triggered when the running thread is mapped to a task which completed
-      # mode = 8 indicates it's a per-cpu timer (not used for sleeping until next release), while sleep_until uses mode=1
-      # thus we can filter on mode=1
-      self.sleep_timers[hrtimer] = task
-
-  def exec_data_str(self, exec_data: dict[str, ExecData]) -> str:
-    ordered_data = list(exec_data.values())
-    ordered_data.sort(key = lambda data : (data.name.split(":")[0], -data.count))
-    res: list[str] = []
-    res.append("TABLE")
-    res.append("                   name               count                 min                mean              median                 max")
-    for data in ordered_data:
-      name = data.name.rjust(30, " ")
-      def fmt(v: int | float):
-        return "{:.3f}".format(v).rjust(20, " ")
-      def ifmt(v: int):
-        return str(v).rjust(20, " ")
-      res.append(f" - {name}{ifmt(data.count)}{ifmt(data.min_runtime)}{fmt(data.mean_runtime)}{fmt(data.median_runtime)}{ifmt(data.max_runtime)}")
-    
-    res.append("")
-    res.append("RAW DATA")
-    for data in ordered_data:
-      dura_strs = ", ".join(str(dura) for dura in data.durations)
-      res.append(f"{data.name}: [{dura_strs}]")
-    return "\n".join(res)
\ No newline at end of file
+    # the scheduler class profiles know which timers release their tasks, a task of a known class is only released by
+    # its own class's timers
+    profiles = self.profiles
+    if task is not None and task.sched_class is not None:
+      profile = self.profiles_by_name.get(task.sched_class)
+      profiles = [ profile ] if profile is not None else []
+    for profile in profiles:
+      release_task = profile.release_timer_task(self.time, cpu, task, hrtimer, mode)
+      if release_task is not None:
+        self.sleep_timers[hrtimer] = release_task
+        break
@@ -0,0 +1,99 @@
+# reading traces straight from .tar.gz/.tar.zst archives
+# members are stream-decompressed one at a time (no intermediate .tar) into a scratch directory that is removed
+# after parsing; babeltrace needs all streams at once, so the scratch directory holds the full uncompressed size of
+# the trace's CTF files (other files of the archive are skipped)
+# point the scratch directory at a tmpfs (e.g. /dev/shm) to keep the decoded trace in memory
+
+from trace_info import CTF_METADATA_FILE, CTF_INDEX_DIR, size2str, stream_cpu_id
+
+from contextlib import contextmanager
+from typing import Iterator
+import errno
+import os
+
+# tarfile, subprocess and tempfile are imported when an archive is opened: every command checks whether its
+# trace is an archive, and loading them unconditionally is a noticeable part of the startup time
+
+ARCHIVE_SUFFIXES = { ".tar": "", ".tar.gz": "gz", ".tgz": "gz", ".tar.zst": "zst", ".tar.zstd": "zst" } # suffix -> compression
+
+def archive_compression(path: str) -> str | None:
+  for suffix, compression in ARCHIVE_SUFFIXES.items():
+    if path.endswith(suffix):
+      return compression
+  return None
+
+def is_trace_archive(path: str) -> bool:
+  return os.path.isfile(path) and archive_compression(path) is not None
+
+# iterate the members of an archive as they are decompressed
+# uncompressed archives are opened seekable, so skipped members are seeked over instead of read; compressed archives
+# have no index of their members, reaching a member's header means decompressing everything before it
+@contextmanager
+def open_archive(path: str) -> Iterator["tarfile.TarFile"]:
+  import shutil, subprocess, tarfile
+  compression = archive_compression(path)
+  if compression == "":
+    with tarfile.open(path, "r:") as archive:
+      yield archive
+    return
+  if compression != "zst":
+    with tarfile.open(path, f"r|{compression}") as archive:
+      yield archive
+    return
+
+  # zstd is not in the standard library, decompress through the zstd cli
+  if shutil.which("zstd") is None:
+    raise Exception(f"Reading {path} requires the zstd command line tool")
+  process = subprocess.Popen([ "zstd", "-dc", "--", path ], stdout=subprocess.PIPE)
+  try:
+    with tarfile.open(fileobj=process.stdout, mode="r|") as archive:
+      yield archive
+  finally:
+    process.stdout.close()
+    if process.wait() not in (0, -13): # SIGPIPE if we stopped reading early
+      raise Exception(f"zstd failed to decompress {path} (exit code {process.returncode})")
+
+# extract the CTF files of an archive into dest: metadata, packet indexes and data streams (named <channel>_<cpu>)
+#   scratch_limit: maximum bytes to extract (raises before exceeding it)
+#   placeholders: only extract CTF metadata and indexes, data streams become sparse files of the same size (nothing of
+#     them is written, but compressed archives are still decompressed to reach the members after them)
+def extract_trace_archive(path: str, dest: str, scratch_limit: int | None = None, placeholders: bool = False):
+  import tarfile
+  extracted = 0
+  with open_archive(path) as archive:
+    for member in archive:
+      if not member.isfile():
+        continue
+      name = os.path.basename(member.name)
+      is_ctf_info = name == CTF_METADATA_FILE or os.path.basename(os.path.dirname(member.name)) == CTF_INDEX_DIR
+      if not is_ctf_info and (name.startswith(".") or stream_cpu_id(name) == -1):
+        continue # not opened by the parser
+      if placeholders and not is_ctf_info:
+        file_path = os.path.join(dest, tarfile.data_filter(member, dest).name)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "wb") as file:
+          file.truncate(member.size)
+        continue
+
+      if scratch_limit is not None and extracted + member.size > scratch_limit:
+        raise Exception(f"Extracting {path} needs more than the {size2str(scratch_limit)} scratch limit (at {member.name}, {size2str(extracted)} extracted): parsing an archive extracts the full uncompressed size of its CTF files")
+      try:
+        archive.extract(member, dest, filter="data")
+      except OSError as err:
+        if err.errno != errno.ENOSPC:
+          raise
+        raise Exception(f"Out of scratch space in {dest} extracting {path} (at {member.name}, {size2str(extracted)} extracted): parsing an archive extracts the full uncompressed size of its CTF files, use --scratch-dir for a larger directory") from err
+      extracted += member.size
+
+# path of the trace data to parse: the path itself for directories, else a scratch directory holding the
+# extracted archive for the duration of the context
+@contextmanager
+def extracted_trace(path: str, scratch_dir: str | None = None, scratch_limit: int | None = None, placeholders: bool = False) -> Iterator[str]:
+  if not is_trace_archive(path):
+    yield path
+    return
+
+  import tempfile
+  with tempfile.TemporaryDirectory(prefix="trace-", dir=scratch_dir) as dest:
+    extract_trace_archive(path, dest, scratch_limit, placeholders)
+    yield dest
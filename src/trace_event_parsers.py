@@ -2,35 +2,70 @@
 
 from trace_imports import *
 from task_tracker import *
-from sched_class_funcs import *
+from sched_profiles import PROFILE_FUNCS
+from trace_info import stream_cpu_id
 
-import sys
+from time import monotonic
 
 # trace event name --> parser bookkeeping
 
 parser_map: dict[str, Callable[[TaskTracker, TraceEventMessage], Any]] = {}
 
-display_data = {
-  "next_update": datetime.datetime(year=1960, month=1, day=1),
-  "update_period": datetime.timedelta(seconds=0.1),
-  "parsed_msgs": 0
-}
+PROGRESS_UPDATE_PERIOD = 0.1 # seconds
 
 def parse_trace_event_message(tracker: TaskTracker, msg: TraceEventMessage) -> Any:
-  old_print_count = print_count["amount"]
+  old_print_count = tracker.printer.amount
   name = msg.event.name
-  tracker.set_time(msg.default_clock_snapshot.ns_from_origin)
-  ret = parser_map[name](tracker, msg.event) if name in parser_map else None
-  display_data["parsed_msgs"] += 1
-  now = datetime.datetime.now()
+  time = msg.default_clock_snapshot.ns_from_origin
+  cpu_id = event_cpu_id(msg.event)
+  try:
+    tracker.set_time(time)
+    tracker.record_event(cpu_id, name)
+    ret = parser_map[name](tracker, msg.event) if name in parser_map else None
+  except Exception as err:
+    if not tracker.lenient:
+      raise
+    tracker.quarantine(err, name, cpu_id)
+    ret = None
+  if tracker.lenient:
+    tracker.recent_events.append((time, name))
+  tracker.parsed_msgs += 1
 
   # display progress bar
-  if print_count["amount"] != old_print_count or now >= display_data["next_update"]:
-    display_data["next_update"] = now + display_data["update_period"]
-    parsed_msgs = display_data["parsed_msgs"]
-    print(f"{parsed_msgs} [{time2str(tracker.time)}]", end="\r")
+  if tracker.config.progress:
+    now = monotonic()
+    if tracker.printer.amount != old_print_count or now >= tracker.next_progress_update:
+      tracker.next_progress_update = now + PROGRESS_UPDATE_PERIOD
+      print(f"{tracker.parsed_msgs} [{time2str(tracker.time)}]", end="\r")
   return ret
 
+# events lost by the tracer, reported by babeltrace between the packets of a stream
+def parse_discarded_message(tracker: TaskTracker, msg: TraceDiscardedEventsMessage | TraceDiscardedPacketsMessage):
+  stream = msg.stream
+  count = msg.count if msg.count is not None else 1 # unknown count: at least one
+  if type(msg) is TraceDiscardedEventsMessage:
+    lost_events, lost_packets, has_times = count, 0, stream.cls.discarded_events_have_default_clock_snapshots
+  else:
+    lost_events, lost_packets, has_times = 0, count, stream.cls.discarded_packets_have_default_clock_snapshots
+  begin_time, end_time = tracker.time, tracker.time
+  if has_times:
+    begin_time, end_time = msg.beginning_default_clock_snapshot.ns_from_origin, msg.end_default_clock_snapshot.ns_from_origin
+  # lttng tags each trace with its domain (kernel or ust), other tracers are assumed to trace the kernel
+  domain = stream.trace.environment.get("domain")
+  tracker.lose_events(stream_cpu_id(stream.name), lost_events, lost_packets, begin_time, end_time, domain is None or str(domain) == "kernel")
+
+# packets are where the per-cpu event rates are sampled (see DataQuality.record_packet)
+def parse_packet_message(tracker: TaskTracker, msg: TracePacketBeginningMessage):
+  stream = msg.packet.stream
+  time = msg.default_clock_snapshot.ns_from_origin if stream.cls.packets_have_beginning_default_clock_snapshot else tracker.time
+  tracker.quality.record_packet(stream_cpu_id(stream.name), time)
+
+def event_cpu_id(event: TraceEvent) -> int:
+  try:
+    return event["cpu_id"]
+  except KeyError:
+    return -1
+
 def trace_event_parser(name):
   def decorator(func):
     parser_map[name] = func
@@ -65,7 +100,11 @@ def deadline_overrun(tracker: TaskTracker, event: TraceEvent):
 
 @trace_event_parser("sched_switch")
 def sched_switch(tracker: TaskTracker, event: TraceEvent):
-  tracker.switch(event["cpu_id"], event["prev_tid"], event["next_tid"])
+  tracker.switch(event["cpu_id"], event["prev_tid"], event["next_tid"], event["prev_state"], event["next_prio"])
+
+@trace_event_parser("sched_wakeup")
+def sched_wakeup(tracker: TaskTracker, event: TraceEvent):
+  tracker.wakeup(event["tid"])
 
 # NOTE: NOT ACTUALLY THE SCHEDULER
 # @trace_event_parser("x86_irq_vectors_reschedule_entry")
@@ -89,17 +128,19 @@ def rcu_util(tracker: TaskTracker, event: TraceEvent):
 def migrate(tracker: TaskTracker, event: TraceEvent):
   tracker.migrate(event["tid"], event["orig_cpu"], event["dest_cpu"])
 
-def gen_sfunc_handlers(name):
-  @trace_event_parser(f"{name}_entry")
-  def sfunc_entry(tracker: TaskTracker, event: TraceEvent):
-    tracker.sfunc_entry(name, event["cpu_id"])
-  @trace_event_parser(f"{name}_exit")
-  def sfunc_exit(tracker: TaskTracker, event: TraceEvent):
-    tracker.sfunc_exit(name, event["cpu_id"])
-  return sfunc_entry, sfunc_exit
+# sfunc event name -> traced function, precomputed so all sfunc events share two handlers
+SFUNC_TRACED = PROFILE_FUNCS + [ "timer_hrtimer_expire", "replenish_dl_entity", "dl_task_timer" ]
+SFUNC_ENTRY_EVENTS = dict((f"{name}_entry", name) for name in SFUNC_TRACED)
+SFUNC_EXIT_EVENTS = dict((f"{name}_exit", name) for name in SFUNC_TRACED)
+
+def sfunc_entry(tracker: TaskTracker, event: TraceEvent):
+  tracker.sfunc_entry(SFUNC_ENTRY_EVENTS[event.name], event["cpu_id"])
 
-for sfunc in SFUNCS:
-  gen_sfunc_handlers(sfunc)
+def sfunc_exit(tracker: TaskTracker, event: TraceEvent):
+  tracker.sfunc_exit(SFUNC_EXIT_EVENTS[event.name], event["cpu_id"])
+
+parser_map.update(dict.fromkeys(SFUNC_ENTRY_EVENTS, sfunc_entry))
+parser_map.update(dict.fromkeys(SFUNC_EXIT_EVENTS, sfunc_exit))
 
 # to figure out when a task is truly released,
 # identify which hrtimer was called during its sched_yield
@@ -116,7 +157,3 @@ def hrtimer_cancel(tracker: TaskTracker, event: TraceEvent):
 @trace_event_parser("timer_hrtimer_start")
 def hrtimer_start(tracker: TaskTracker, event: TraceEvent):
   tracker.hrtimer_start(event["cpu_id"], event["hrtimer"], event["mode"])
-
-gen_sfunc_handlers("timer_hrtimer_expire")
-gen_sfunc_handlers("replenish_dl_entity")
-gen_sfunc_handlers("dl_task_timer")
@@ -0,0 +1,269 @@
+# quick trace inventory read from CTF metadata and packet indexes (no event iteration)
+
+from utils.pretty_time import time2str, duration2str
+
+import os
+import re
+import struct
+
+CTF_METADATA_FILE = "metadata"
+CTF_INDEX_DIR = "index"
+CTF_INDEX_MAGIC = 0xC1F1DCC1
+CTF_METADATA_PACKET_MAGIC = 0x75D11D57
+CTF_METADATA_PACKET_HEADER_SIZE = 37
+TASKSET_INIT_EVENT = "task_proc:taskset_init"
+
+# file (relative to the output directory) recording measured parse throughput
+PARSE_BENCHMARK_FILE = "parse_benchmark.txt"
+DEFAULT_BYTES_PER_SEC = 5000000 # conservative fallback when no parse has been benchmarked yet
+
+# represents a CTF clock declaration
+class ClockInfo:
+  def __init__(self, name: str, freq: int, offset_s: int, offset: int):
+    self.name = name
+    self.freq = freq
+    self.offset_s = offset_s
+    self.offset = offset
+
+  # convert a clock cycle value into ns from origin
+  def to_ns(self, cycles: int) -> int:
+    return self.offset_s * 1000000000 + (self.offset + cycles) * 1000000000 // self.freq
+
+# represents a single entry of a stream's packet index
+class PacketIndexEntry:
+  def __init__(self, offset: int, packet_size: int, content_size: int, timestamp_begin: int, timestamp_end: int, events_discarded: int, stream_id: int, packet_seq_num: int | None):
+    self.offset = offset
+    self.packet_size = packet_size # bits
+    self.content_size = content_size # bits
+    self.timestamp_begin = timestamp_begin # clock cycles
+    self.timestamp_end = timestamp_end # clock cycles
+    self.events_discarded = events_discarded # cumulative over the stream
+    self.stream_id = stream_id
+    self.packet_seq_num = packet_seq_num
+
+# represents a single CTF data stream file (one per cpu per channel)
+class StreamInfo:
+  def __init__(self, path: str, cpu_id: int, size: int, packets: list[PacketIndexEntry] | None):
+    self.path = path
+    self.cpu_id = cpu_id
+    self.size = size # bytes on disk
+    self.packets = packets # None if the stream has no index
+
+  @property
+  def lost_events(self) -> int:
+    if not self.packets:
+      return 0
+    return max(packet.events_discarded for packet in self.packets)
+
+  @property
+  def lost_packets(self) -> int:
+    if not self.packets or self.packets[0].packet_seq_num is None:
+      return 0
+    seq_nums = [ packet.packet_seq_num for packet in self.packets ]
+    return max(seq_nums) - min(seq_nums) + 1 - len(set(seq_nums))
+
+# represents a single CTF trace (directory containing a metadata file)
+class CTFTraceInfo:
+  def __init__(self, path: str, env: dict[str, str], clock: ClockInfo | None, event_names: list[str], stream_ids: list[int], streams: list[StreamInfo]):
+    self.path = path
+    self.env = env
+    self.clock = clock
+    self.event_names = event_names
+    self.stream_ids = stream_ids
+    self.streams = streams
+
+  @property
+  def size(self) -> int:
+    return sum(stream.size for stream in self.streams)
+
+  # (begin, end) in ns from origin, or None if no stream is indexed
+  def time_span(self) -> tuple[int, int] | None:
+    packets = [ packet for stream in self.streams if stream.packets for packet in stream.packets ]
+    if len(packets) == 0 or self.clock is None:
+      return None
+    return self.clock.to_ns(min(p.timestamp_begin for p in packets)), self.clock.to_ns(max(p.timestamp_end for p in packets))
+
+  @property
+  def is_userspace(self) -> bool:
+    return TASKSET_INIT_EVENT in self.event_names
+
+# read the TSDL text of a metadata file (plain text or packetized)
+def read_metadata_text(path: str) -> str:
+  with open(path, "rb") as file:
+    data = file.read()
+
+  byte_order = None
+  if len(data) >= 4:
+    for order in [ "<", ">" ]:
+      if struct.unpack(f"{order}I", data[:4])[0] == CTF_METADATA_PACKET_MAGIC:
+        byte_order = order
+  if byte_order is None:
+    return data.decode("utf-8", errors="replace")
+
+  chunks: list[bytes] = []
+  offset = 0
+  while offset + CTF_METADATA_PACKET_HEADER_SIZE <= len(data):
+    content_size, packet_size = struct.unpack(f"{byte_order}II", data[offset+24:offset+32])
+    chunks.append(data[offset + CTF_METADATA_PACKET_HEADER_SIZE:offset + content_size // 8])
+    if packet_size == 0:
+      break
+    offset += packet_size // 8
+  return b"".join(chunks).decode("utf-8", errors="replace")
+
+def parse_tsdl_assignments(block: str) -> dict[str, str]:
+  return dict((key, value.strip().strip('"')) for key, value in re.findall(r"(\w+)\s*=\s*([^;]+);", block))
+
+def parse_tsdl_int(value: str) -> int:
+  return int(value.rstrip("ULul"), 0)
+
+# read the packet index of a stream (None if it was not indexed)
+def read_packet_index(path: str) -> list[PacketIndexEntry] | None:
+  if not os.path.isfile(path):
+    return None
+
+  with open(path, "rb") as file:
+    data = file.read()
+  if len(data) < 16:
+    return None
+  magic, _, _, entry_len = struct.unpack(">IIII", data[:16])
+  if magic != CTF_INDEX_MAGIC or entry_len < 56:
+    return None
+
+  packets: list[PacketIndexEntry] = []
+  for offset in range(16, len(data) - entry_len + 1, entry_len):
+    fields = struct.unpack_from(">7Q", data, offset)
+    packet_seq_num = struct.unpack_from(">Q", data, offset + 64)[0] if entry_len >= 72 else None
+    packets.append(PacketIndexEntry(*fields, packet_seq_num))
+  return packets
+
+# cpu of a data stream, from the _N suffix of its file name (also the stream name given by babeltrace), -1 if unknown
+def stream_cpu_id(name: str | None) -> int:
+  cpu_match = re.search(r"_(\d+)$", name or "")
+  return int(cpu_match.group(1)) if cpu_match else -1
+
+def read_ctf_trace_info(path: str) -> CTFTraceInfo:
+  metadata = read_metadata_text(os.path.join(path, CTF_METADATA_FILE))
+
+  env_match = re.search(r"\benv\s*\{([^{}]*)\}", metadata)
+  env = parse_tsdl_assignments(env_match.group(1)) if env_match else {}
+
+  clocks: list[ClockInfo] = []
+  for block in re.findall(r"\bclock\s*\{([^{}]*)\}", metadata):
+    fields = parse_tsdl_assignments(block)
+    clocks.append(ClockInfo(
+      fields.get("name", ""),
+      parse_tsdl_int(fields.get("freq", "1000000000")),
+      parse_tsdl_int(fields.get("offset_s", "0")),
+      parse_tsdl_int(fields.get("offset", "0"))
+    ))
+  monotonic = [ clock for clock in clocks if clock.name == "monotonic" ]
+  clock = monotonic[0] if len(monotonic) > 0 else clocks[0] if len(clocks) > 0 else None
+
+  event_names = re.findall(r"\bevent\s*\{\s*name\s*=\s*\"?([^\";]+?)\"?\s*;", metadata)
+  stream_ids = sorted(set(int(stream_id) for stream_id in re.findall(r"\bstream\s*\{\s*id\s*=\s*(\d+)", metadata)))
+
+  streams: list[StreamInfo] = []
+  for name in sorted(os.listdir(path)):
+    stream_path = os.path.join(path, name)
+    if name == CTF_METADATA_FILE or name.startswith(".") or not os.path.isfile(stream_path):
+      continue
+    streams.append(StreamInfo(
+      stream_path,
+      stream_cpu_id(name),
+      os.path.getsize(stream_path),
+      read_packet_index(os.path.join(path, CTF_INDEX_DIR, f"{name}.idx"))
+    ))
+
+  return CTFTraceInfo(path, env, clock, event_names, stream_ids, streams)
+
+# find all CTF traces under a trace directory
+def find_ctf_traces(path: str) -> list[str]:
+  return sorted(root for root, _, files in os.walk(path) if CTF_METADATA_FILE in files)
+
+def read_trace_info(path: str) -> list[CTFTraceInfo]:
+  return [ read_ctf_trace_info(trace_path) for trace_path in find_ctf_traces(path) ]
+
+# total size of the data streams of all CTF traces under path
+def trace_size(path: str) -> int:
+  return sum(trace.size for trace in read_trace_info(path))
+
+# count tasksets by iterating only the (small) userspace traces
+def count_tasksets(traces: list[CTFTraceInfo]) -> int | None:
+  userspace_traces = [ trace.path for trace in traces if trace.is_userspace ]
+  if len(userspace_traces) == 0:
+    return None
+
+  from trace_imports import bt2, TraceEventMessage
+  count = 0
+  for msg in bt2.TraceCollectionMessageIterator(userspace_traces):
+    if type(msg) is TraceEventMessage and msg.event.name == TASKSET_INIT_EVENT:
+      count += 1
+  return count
+
+# read (bytes/s, events/byte) recorded by the last full parse into output_path
+def read_parse_benchmark(output_path: str) -> tuple[float, float | None]:
+  path = os.path.join(output_path, PARSE_BENCHMARK_FILE)
+  if not os.path.isfile(path):
+    return DEFAULT_BYTES_PER_SEC, None
+
+  with open(path) as file:
+    fields = dict(line.strip().split("=", 1) for line in file if "=" in line)
+  return float(fields["bytes_per_sec"]), float(fields["events_per_byte"])
+
+def write_parse_benchmark(output_path: str, size: int, events: int, elapsed: float):
+  with open(os.path.join(output_path, PARSE_BENCHMARK_FILE), "w") as file:
+    file.write(f"bytes_per_sec={size / max(elapsed, 1e-9)}\n")
+    file.write(f"events_per_byte={events / max(size, 1)}\n")
+
+def size2str(size: int) -> str:
+  for unit in [ "B", "KiB", "MiB", "GiB" ]:
+    if size < 1024 or unit == "GiB":
+      return f"{size:.1f} {unit}" if unit != "B" else f"{size} {unit}"
+    size /= 1024
+
+def trace_info_str(traces: list[CTFTraceInfo], tasksets: int | None, bytes_per_sec: float, events_per_byte: float | None) -> str:
+  res: list[str] = []
+  total_size = 0
+  total_lost_events = 0
+  total_lost_packets = 0
+  spans: list[tuple[int, int]] = []
+  cpu_ids: set[int] = set()
+  for trace in traces:
+    domain = trace.env.get("domain", "?")
+    span = trace.time_span()
+    res.append(f"[{domain}] {trace.path}")
+    res.append(f"  streams: {len(trace.streams)} files ({len(trace.stream_ids)} classes), event classes: {len(trace.event_names)}")
+    if span is not None:
+      spans.append(span)
+      res.append(f"  time span: {time2str(span[0])} -> {time2str(span[1])} ({duration2str(span[1] - span[0])})")
+    else:
+      res.append("  time span: unknown (no packet index)")
+
+    cpu_sizes: dict[int, list[StreamInfo]] = {}
+    for stream in trace.streams:
+      cpu_sizes.setdefault(stream.cpu_id, []).append(stream)
+    for cpu_id, streams in sorted(cpu_sizes.items()):
+      size = sum(stream.size for stream in streams)
+      packets = sum(len(stream.packets) for stream in streams if stream.packets)
+      lost_events = sum(stream.lost_events for stream in streams)
+      lost_packets = sum(stream.lost_packets for stream in streams)
+      lost = "" if lost_events == 0 and lost_packets == 0 else f", LOST {lost_events} events / {lost_packets} packets"
+      res.append(f"  cpu{cpu_id}: {size2str(size)} in {packets} packets{lost}")
+      if cpu_id != -1: cpu_ids.add(cpu_id)
+      total_lost_events += lost_events
+      total_lost_packets += lost_packets
+    total_size += trace.size
+
+  res.append("")
+  res.append(f"cpus: {len(cpu_ids)}")
+  if len(spans) > 0:
+    begin = min(span[0] for span in spans)
+    end = max(span[1] for span in spans)
+    res.append(f"time span: {time2str(begin)} -> {time2str(end)} ({duration2str(end - begin)})")
+  res.append(f"data volume: {size2str(total_size)}")
+  if events_per_byte is not None:
+    res.append(f"events: ~{round(total_size * events_per_byte)} (estimated)")
+  res.append(f"lost events: {total_lost_events}, lost packets: {total_lost_packets}")
+  res.append(f"tasksets: {'unknown (no userspace trace)' if tasksets is None else tasksets}")
+  res.append(f"estimated parse time: {duration2str(round(total_size / bytes_per_sec * 1000000000))} (at {size2str(round(bytes_per_sec))}/s)")
+  return "\n".join(res)
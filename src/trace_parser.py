@@ -0,0 +1,61 @@
+# library entry points for parsing LTTNG traces generated from experiments
+#
+# example:
+#   from config import Config
+#   from trace_parser import parse_trace
+#   tasksets = parse_trace("path/to/trace", Config(progress=False))
+#
+# each call creates its own TaskTracker from the given config, so several traces
+# can be parsed concurrently in threads or worker processes of one interpreter
+
+from trace_imports import *
+from trace_event_parsers import parse_trace_event_message, parse_discarded_message, parse_packet_message
+from task_tracker import TaskTracker
+from task_model import CompletedTaskset
+from config import Config
+from trace_archive import is_trace_archive, extracted_trace
+from trace_info import read_trace_info
+from sched_profiles import select_profiles
+
+def extract_trace(path) -> TraceIterator:
+  return bt2.TraceCollectionMessageIterator(path)
+
+# parse a trace into a TaskTracker holding the completed (and in lenient mode, quarantined) tasksets
+#   source: path to the LTTNG trace data (directory or archive), or an already constructed message iterator
+#   config: parser configuration (defaults to Config())
+#   taskset_listeners: called with each CompletedTaskset as soon as it completes (e.g. for streaming exports)
+def track_trace(source: str | TraceIterator, config: Config | None = None, taskset_listeners: list[Callable[[CompletedTaskset], None]] | None = None) -> TaskTracker:
+  if isinstance(source, str) and is_trace_archive(source):
+    config = config if config is not None else Config()
+    with extracted_trace(source, config.scratch_dir, config.scratch_limit) as path:
+      return track_trace(path, config, taskset_listeners)
+
+  trace = extract_trace(source) if isinstance(source, str) else source
+  tracker = TaskTracker(config)
+  tracker.taskset_listeners.extend(taskset_listeners or [])
+  if isinstance(source, str) and tracker.config.sched_classes is None:
+    tracker.set_profiles(select_profiles([ name for info in read_trace_info(source) for name in info.event_names ]))
+  if tracker.config.verbose: tracker.printer.print(f"scheduler class profiles: {', '.join(map(str, tracker.profiles))}")
+
+  for msg in trace:
+    msg_type = type(msg)
+    if msg_type is TraceEventMessage:
+      parse_trace_event_message(tracker, msg)
+    elif msg_type is TracePacketBeginningMessage:
+      parse_packet_message(tracker, msg)
+    elif msg_type is TraceDiscardedEventsMessage or msg_type is TraceDiscardedPacketsMessage:
+      parse_discarded_message(tracker, msg)
+
+  if not tracker.is_complete:
+    error = Exception("Last taskset never completed (likely missing tracepoints)")
+    if not tracker.lenient:
+      raise error
+    tracker.quarantine(error, "end of trace", -1)
+
+  return tracker
+
+# parse a trace and return its completed tasksets (nothing is written to config.output_path)
+#   source: path to the LTTNG trace data (directory or archive), or an already constructed message iterator
+#   config: parser configuration (defaults to Config())
+def parse_trace(source: str | TraceIterator, config: Config | None = None) -> list[CompletedTaskset]:
+  return track_trace(source, config).completed_tasksets
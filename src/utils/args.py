@@ -1,22 +1,74 @@
 import argparse
 import os
+import sys
 
-# global way to access args
-class Args:
-  pass
+from trace_archive import is_trace_archive
+from config import ANALYSES
 
-def dir_path(string) -> str:
-  if os.path.isdir(string):
+# trace directory or trace archive
+def trace_path(string) -> str:
+  if os.path.isdir(string) or is_trace_archive(string):
     return string
   else:
     raise NotADirectoryError(string)
 
-def parse_args() -> argparse.Namespace:
-  parser = argparse.ArgumentParser(description="Extract data from experiments lttng trace data")
-  parser.add_argument("path", help="Path to LTTNG trace data", type=dir_path)
+def parse_command_args(parser: argparse.ArgumentParser):
+  parser.add_argument("path", help="Path to LTTNG trace data (directory or .tar/.tar.gz/.tar.zst archive, which is extracted in full into the scratch directory while parsing)", type=trace_path)
   parser.add_argument("-r", "--render", help="Render visualization of job executions", action=argparse.BooleanOptionalAction)
   parser.add_argument("-v", "--verbose", help="Output debug logs", action=argparse.BooleanOptionalAction)
   parser.add_argument("-o", "--output-path", help="Path to output to", default="./output")
-  args = parser.parse_args()
-  for field in vars(args):
-    setattr(Args, field, getattr(args, field))
\ No newline at end of file
+  parser.add_argument("-l", "--lenient", help="Quarantine tasksets with tracking errors instead of aborting", action=argparse.BooleanOptionalAction)
+  parser.add_argument("--cache", help="Reuse (and store) parsed results in the output directory when only output options changed", action=argparse.BooleanOptionalAction, default=True)
+  parser.add_argument("--exec-blocks", help="Keep the exec blocks of each job for analyses (implied by --render and --sqlite)", action=argparse.BooleanOptionalAction)
+  parser.add_argument("--overhead-bucket", help="Bucket size (ns) of the per-cpu scheduler overhead timelines", type=int, default=1000000, metavar="NS")
+  parser.add_argument("--outliers", help="Number of top anomalies (with their context) kept per taskset, 0 disables outlier detection", type=int, default=10, metavar="N")
+  parser.add_argument("--outlier-threshold", help="Robust z-score (against the rolling median/MAD) above which an occurrence is an outlier", type=float, default=8.0)
+  parser.add_argument("--sched-class", help="Scheduler class profile to track the functions and release timers of (sched_dl, sched_ext or sched_rt, repeatable, default: the classes whose functions the trace declares). A task's release timer is only matched against the class of its sched_switch priority. sched_rt only recognizes the sleep_until timer of a completed job, RT throttling is not detected", action="append", metavar="CLASS")
+  parser.add_argument("--probe-overhead", help="Cost of a single sched function tracepoint used to correct the call tree times (default: estimated from the shortest leaf function durations)", type=float, metavar="NS")
+  parser.add_argument("--probe-calibration", help="Estimate the tracepoint cost only from this (calibration) taskset", type=int, metavar="TASKSET_ID")
+  parser.add_argument("--min-quality", help="Leave tasksets whose data quality score (estimated fraction of events not lost by the tracer) is below this out of the combined statistics", type=float, metavar="SCORE")
+  parser.add_argument("--scratch-dir", help="Directory trace archives are extracted to while parsing, it needs the full uncompressed size of the trace's CTF files (e.g. /dev/shm to keep them in memory, default: system temp directory)", metavar="DIR")
+  parser.add_argument("--scratch-limit", help="Abort if extracting a trace archive needs more than this many GiB (the full uncompressed trace is kept in the scratch directory while parsing)", type=float, metavar="GIB")
+  parser.add_argument("--analysis", help=f"Analysis whose outputs are written ({', '.join(ANALYSES)}, or none for only the stats and data quality; repeatable, default: all). The modules of the other analyses (and numpy, if none needs it) are not loaded", action="append", choices=ANALYSES + [ "none" ], metavar="NAME")
+  parser.add_argument("--sqlite", help="Export tasksets, tasks, jobs and blocks into a SQLite database (default: <output path>/results.sqlite)", nargs="?", const="", metavar="DB_PATH")
+
+def info_command_args(parser: argparse.ArgumentParser):
+  parser.add_argument("path", help="Path to LTTNG trace data (directory or .tar/.tar.gz/.tar.zst archive, of which only the metadata and indexes are extracted)", type=trace_path)
+  parser.add_argument("-o", "--output-path", help="Output path of a previous parse (used for its benchmarked throughput)", default="./output")
+  parser.add_argument("--no-tasksets", help="Skip counting tasksets in the userspace trace", dest="count_tasksets", action="store_false")
+
+def compare_command_args(parser: argparse.ArgumentParser):
+  parser.add_argument("a", help="Output directory (or parse cache file) of the baseline run")
+  parser.add_argument("b", help="Output directory (or parse cache file) of the run to compare against the baseline")
+  parser.add_argument("-t", "--threshold", help="Relative increase (%%) of a percentile flagged as a regression if significant", type=float, default=5.0, metavar="PCT")
+  parser.add_argument("-p", "--percentiles", help="Percentiles to compare", type=float, nargs="+", default=[ 50, 90, 99 ])
+  parser.add_argument("--confidence", help="Confidence level of the bootstrap intervals", type=float, default=0.95)
+  parser.add_argument("--resamples", help="Number of bootstrap resamples", type=int, default=2000)
+  parser.add_argument("--seed", help="Seed of the bootstrap resampling", type=int, default=0)
+  parser.add_argument("--metrics", help="Only compare metrics whose name matches this regex", metavar="REGEX")
+  parser.add_argument("--min-quality", help="Leave tasksets whose data quality score is below this out of both runs (as parse does for the combined statistics)", type=float, metavar="SCORE")
+
+# subcommand name -> (description, argument setup)
+# no subcommand means parse
+COMMANDS = {
+  "parse": ("Extract data from experiments lttng trace data", parse_command_args),
+  "info": ("Print a trace inventory from its metadata and packet indexes without parsing events", info_command_args),
+  "compare": ("Compare the metrics of two parsed runs, exiting with 3 on significant regressions (1 on errors)", compare_command_args),
+}
+
+def parse_args() -> argparse.Namespace:
+  argv = sys.argv[1:]
+  command = argv[0] if len(argv) > 0 and argv[0] in COMMANDS else None
+  if command is not None:
+    argv = argv[1:]
+  description, add_args = COMMANDS[command or "parse"]
+  prog = os.path.basename(sys.argv[0])
+  if command is None:
+    others = ", ".join(name for name in COMMANDS if name != "parse")
+    parser = argparse.ArgumentParser(description=description, epilog=f"other commands: {others} (see {prog} <command> -h)")
+  else:
+    parser = argparse.ArgumentParser(description=description, prog=f"{prog} {command}")
+  add_args(parser)
+  args = parser.parse_args(argv)
+  args.command = command or "parse"
+  return args
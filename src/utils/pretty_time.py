@@ -1,8 +1,15 @@
-import datetime
+from time import localtime, strftime
 
 # pretty print time (either epoch or relative to start time)
 def time2str(time, relative_to: int | None = None):
   # for some reason trace compass offsets tracepoints by a certain amount
   fmt = "%m-%d-%Y %H:%M:%S" if relative_to is None else "%H:%M:%S"
   nano = str(time % 1000000000).zfill(9)
-  return datetime.datetime.fromtimestamp(time // 1000000000).strftime(fmt) + "." + nano[:3] + " " + nano[3:6] + " " + nano[6:]
+  return strftime(fmt, localtime(time // 1000000000)) + "." + nano[:3] + " " + nano[3:6] + " " + nano[6:]
+
+# pretty print a duration in ns
+def duration2str(duration: int) -> str:
+  for unit, scale in [ ("h", 3600000000000), ("m", 60000000000), ("s", 1000000000), ("ms", 1000000), ("us", 1000) ]:
+    if duration >= scale:
+      return f"{duration / scale:.2f}{unit}"
+  return f"{duration}ns"
@@ -1,14 +1,8 @@
-import builtins
-
-print_count = {
-  "amount": 0
-}
-
-if not hasattr(builtins, "_original_print"):
-    builtins._original_print = builtins.print
-
-def print(*args, **kwargs):
-  builtins._original_print(*args, **kwargs)
-  print_count["amount"] += 1
-
-builtins.print = print
+# counts prints so the progress line can be redrawn right after other output
+class PrintTracker:
+  def __init__(self):
+    self.amount = 0
+
+  def print(self, *args, **kwargs):
+    print(*args, **kwargs)
+    self.amount += 1
@@ -42,7 +42,7 @@ INIT_EVENT_COLOR = rgb(0, 0, 0)
 TASKSET_COMPLETION_COLOR = rgb(0, 0, 0)
 SFUNC_BLOCK_COLOR = rgb(0.75, 0.75, 0.75)
 
-def render(taskset: CompletedTaskset, output_path: str):
+def render(taskset: CompletedTaskset, output_path: str, config: Config):
   task_y: dict[int, int] = dict([ task.task_id, 0 ] for task in taskset.tasks)
   for track_idx, task_id in enumerate(task_y.keys()):
     task_y[task_id] = track_idx * TRACK_HEIGHT + MARGIN_PADDING
@@ -203,7 +203,7 @@ def render(taskset: CompletedTaskset, output_path: str):
     draw_marker(time, y, f"J{job_id} {exit_status_str}")
   
   # draw exec blocks
-  if Args.verbose: print("drawing exec blocks")
+  if config.verbose: print("drawing exec blocks")
   for job in taskset.jobs:
     if job.exec_blocks is None:
       continue
@@ -212,7 +212,7 @@ def render(taskset: CompletedTaskset, output_path: str):
       draw_task_exec_block(exec_block)
 
   # draw sfunc blocks
-  if Args.verbose: print("drawing sfunc blocks")
+  if config.verbose: print("drawing sfunc blocks")
   for sfunc_block in taskset.sfunc_blocks:
     # draw_sfunc_block(sfunc_block)
     pass
@@ -224,7 +224,7 @@ def render(taskset: CompletedTaskset, output_path: str):
   # TODO
 
   # draw realtime events
-  if Args.verbose: print("drawing realtime events")
+  if config.verbose: print("drawing realtime events")
   for job in taskset.jobs:
     y = task_y[job.task_id]
     params = taskset.tasks[job.task_id].params
@@ -244,7 +244,7 @@ def render(taskset: CompletedTaskset, output_path: str):
     if params.period != params.deadline: draw_arrow(job.absolute_deadline - taskset.init_time, y, False, DEADLINE_COLOR, job.job_id)
 
   # draw task inits
-  if Args.verbose: print("drawing task inits")
+  if config.verbose: print("drawing task inits")
   for task in taskset.tasks:
     y = task_y[task.task_id]
     x = (task.init_time - taskset.init_time) * TIME_SCALE
@@ -261,7 +261,7 @@ def render(taskset: CompletedTaskset, output_path: str):
     draw_marker(task.init_time - taskset.init_time, y, f"T{task.task_id} init")
   
   # draw taskset completion
-  if Args.verbose: print("drawing taskset completion")
+  if config.verbose: print("drawing taskset completion")
   tcx = duration * TIME_SCALE + MARGIN_PADDING
   draw_box(
     tcx, MARGIN_PADDING,
@@ -270,12 +270,12 @@ def render(taskset: CompletedTaskset, output_path: str):
   )
 
   # draw track lines
-  if Args.verbose: print("drawing track lines")
+  if config.verbose: print("drawing track lines")
   for y in [ *task_y.values(), *core_y.values() ]:
     draw_box(0, y + TRACK_HEIGHT, img_width, TRACK_LINE_HEIGHT, "black")
 
   # output
-  if Args.verbose: print("saving to output")
+  if config.verbose: print("saving to output")
   tree = ET.ElementTree(svg)
   tree.write(output_path)
   
\ No newline at end of file
@@ -0,0 +1,68 @@
+# call tree profile: inclusive/exclusive times per call path, probe effect correction and collapsed stacks
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from task_model import SFuncBlock
+from block_arrays import SFuncArrays
+from call_tree import CallTreeProfile, ProbeOverhead
+
+PICK = ("sched_dl", "pick_task_dl")
+PICK_UPDATE = ("sched_dl", "pick_task_dl", "update_curr_dl")
+PICK_UPDATE_DEQUEUE = ("sched_dl", "pick_task_dl", "update_curr_dl", "dequeue_task_dl")
+UPDATE = ("sched_dl", "update_curr_dl")
+
+# cpu0: pick_task_dl [0, 100] calling update_curr_dl [10, 30] and [40, 70], the latter calling dequeue_task_dl [50, 60]
+# cpu1: update_curr_dl [200, 205]
+def blocks() -> list[SFuncBlock]:
+  pick = SFuncBlock("pick_task_dl", 0, None, 0, 0, 100)
+  update = SFuncBlock("update_curr_dl", 0, pick, 1, 40, 70)
+  return [
+    pick,
+    SFuncBlock("update_curr_dl", 0, pick, 1, 10, 30),
+    update,
+    SFuncBlock("dequeue_task_dl", 0, update, 2, 50, 60),
+    SFuncBlock("update_curr_dl", 1, None, 0, 200, 205),
+  ]
+
+# path -> (calls, inclusive, exclusive, children, descendants)
+def by_path(profile: CallTreeProfile) -> dict[tuple[str, ...], tuple[int, int, int, int, int]]:
+  return dict((path, (profile.calls[i], profile.inclusive[i], profile.exclusive[i], profile.children[i], profile.descendants[i])) for i, path in enumerate(profile.paths))
+
+def test_inclusive_exclusive_times():
+  profile = CallTreeProfile.from_arrays(SFuncArrays(blocks()))
+  assert by_path(profile) == {
+    PICK: (1, 100, 50, 2, 3),
+    PICK_UPDATE: (2, 50, 40, 1, 1),
+    PICK_UPDATE_DEQUEUE: (1, 10, 10, 0, 0),
+    UPDATE: (1, 5, 5, 0, 0),
+  }
+  assert by_path(CallTreeProfile.combine([ profile, profile ]))[PICK_UPDATE] == (4, 100, 80, 2, 2)
+
+def test_probe_correction():
+  profile = CallTreeProfile.from_arrays(SFuncArrays(blocks()))
+  inclusive, exclusive = profile.corrected(ProbeOverhead(2.0, "test"))
+  corrected = dict((path, (inclusive[i], exclusive[i])) for i, path in enumerate(profile.paths))
+  # inclusive: o * (calls + 2 * descendants), exclusive: o * (calls + children)
+  assert corrected[PICK] == (86, 44)
+  assert corrected[PICK_UPDATE] == (42, 34)
+  assert corrected[PICK_UPDATE_DEQUEUE] == (8, 8)
+
+  # p1 of the 20 leaf durations 5..24 (linear interpolation)
+  leaves = [ SFuncBlock("update_curr_dl", 0, None, 0, 1000 * i, 1000 * i + 5 + i) for i in range(20) ]
+  estimate = ProbeOverhead.estimate([ SFuncArrays(leaves) ], "test")
+  assert np.isclose(estimate.overhead, 5.19)
+  assert ProbeOverhead.estimate([ SFuncArrays(blocks()) ], "test") is None # too few leaf samples
+
+def test_collapsed_stacks():
+  profile = CallTreeProfile.from_arrays(SFuncArrays(blocks()))
+  assert sorted(profile.collapsed_str().split("\n")) == [
+    "sched_dl;pick_task_dl 50",
+    "sched_dl;pick_task_dl;update_curr_dl 40",
+    "sched_dl;pick_task_dl;update_curr_dl;dequeue_task_dl 10",
+    "sched_dl;update_curr_dl 5",
+  ]
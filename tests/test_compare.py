@@ -0,0 +1,76 @@
+# compare: percentiles, bootstrap, rank-sum test and the exit codes and data quality filtering of the command
+
+import math
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(ROOT, "src"))
+
+from config import Config
+from data_quality import DataQuality
+from task_model import ExecData, CompletedTaskset
+from result_cache import ParseResults, save_cached_results
+from compare import REGRESSION_EXIT_CODE, MetricComparison, sample_percentiles, bootstrap_percentiles, rank_sum_test
+
+# taskset whose job:response_time samples are all value, and whose data quality is lossy if asked
+def taskset(taskset_id: int, value: int, lossy: bool = False) -> CompletedTaskset:
+  quality = DataQuality(0, False)
+  quality.record_event(0)
+  if lossy:
+    quality.record_discarded(0, 9, 0, 0, 1)
+  exec_data = { "job:response_time": ExecData("job:response_time", [ value ] * 20) }
+  return CompletedTaskset(taskset_id, [], exec_data, [], [], [], quality, 0, 1)
+
+def save_run(path: str, tasksets: list[CompletedTaskset]) -> str:
+  os.mkdir(path)
+  save_cached_results(path, Config(output_path=path), ParseResults(tasksets, []))
+  return path
+
+def compare(*args: str) -> int:
+  return subprocess.run([ sys.executable, os.path.join(ROOT, "parse.py"), "compare", *args ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).returncode
+
+def test_exit_codes_and_min_quality(tmp_path):
+  a = save_run(str(tmp_path / "a"), [ taskset(0, 100) ])
+  b = save_run(str(tmp_path / "b"), [ taskset(0, 200, lossy=True), taskset(1, 100) ])
+  assert compare(a, b) == REGRESSION_EXIT_CODE
+  # the regressed taskset lost 90% of its events, as parse would, compare leaves it out
+  assert compare(a, b, "--min-quality", "0.9") == 0
+  assert compare(a, str(tmp_path / "missing")) == 1
+
+def test_percentiles():
+  # smallest value whose cumulative count reaches ceil(p * n)
+  assert sample_percentiles(np.arange(1, 11), [ 50, 90, 100 ]).tolist() == [ 5, 9, 10 ]
+  assert sample_percentiles(np.array([ 3, 1, 2, 1 ]), [ 25, 50, 75 ]).tolist() == [ 1, 1, 2 ]
+  assert sample_percentiles(np.array([ 7 ]), [ 1, 99 ]).tolist() == [ 7, 7 ]
+
+def test_bootstrap_percentiles():
+  rng = np.random.default_rng(0)
+  assert (bootstrap_percentiles(np.full(50, 4), [ 50, 99 ], 100, rng) == 4).all()
+  samples = np.array([ 1, 2, 3, 4, 100 ])
+  boot = bootstrap_percentiles(samples, [ 0, 100 ], 1000, rng)
+  assert boot.shape == (1000, 2)
+  assert np.isin(boot, samples).all()
+  assert (boot[:, 0] <= boot[:, 1]).all()
+
+def test_rank_sum():
+  # b's ranks 4 + 5 + 6: U = 9, E[U] = 4.5, Var[U] = 3 * 3 * 7 / 12
+  z, p = rank_sum_test(np.array([ 1, 2, 3 ]), np.array([ 4, 5, 6 ]))
+  assert math.isclose(z, 4.5 / math.sqrt(5.25))
+  assert math.isclose(p, math.erfc(z / math.sqrt(2)))
+  # ties: average ranks 1.5, 3.5, 5.5 so U = 3.5 + 5.5 + 5.5 - 6, and Var[U] = 9 / 12 * (7 - 18 / 30)
+  z, _ = rank_sum_test(np.array([ 1, 1, 2 ]), np.array([ 2, 3, 3 ]))
+  assert math.isclose(z, 4 / math.sqrt(4.8))
+  assert rank_sum_test(np.array([ 5, 5, 5 ]), np.array([ 5, 5, 5 ])) == (0.0, 1.0)
+
+def test_regression_flagging():
+  rng = np.random.default_rng(0)
+  slower = MetricComparison("m", np.full(20, 100), np.full(20, 200), [ 50 ], 0.05, 0.95, 200, rng)
+  assert [ (d.a, d.b, d.ci_low, d.ci_high, d.regression) for d in slower.deltas ] == [ (100, 200, 100, 100, True) ]
+  within = MetricComparison("m", np.full(20, 100), np.full(20, 104), [ 50 ], 0.05, 0.95, 200, rng)
+  assert not within.deltas[0].regression # +4% is below the threshold
+  few = MetricComparison("m", np.full(5, 100), np.full(5, 200), [ 50 ], 0.05, 0.95, 200, rng)
+  assert few.deltas == [] and few.rank_sum is None
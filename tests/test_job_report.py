@@ -0,0 +1,61 @@
+# job report: per-task response time percentiles, tardiness, misses and the utilization-based bounds
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from config import Config
+from task_model import TaskParams
+from task_tracker import TaskTracker
+from job_report import JobReport
+
+# a job of tid on cpu running from its release until its completion
+def job(tid: int, cpu_id: int, release_time: int, completion_time: int) -> list[tuple]:
+  return [
+    (release_time, "switch", cpu_id, 0, tid),
+    (release_time, "release", tid),
+    (completion_time, "complete", tid),
+    (completion_time, "switch", cpu_id, tid, 0),
+  ]
+
+def report() -> JobReport:
+  tracker = TaskTracker(Config(progress=False, exec_blocks=True, outliers=0))
+  events = [
+    (900, "switch", 0, -1, 0),
+    (900, "switch", 1, -1, 0),
+    (950, "new_taskset"),
+    (950, "add_task", 101, TaskParams(100, 100, 60)),
+    (950, "add_task", 102, TaskParams(200, 200, 50)),
+  ]
+  events += job(101, 0, 1000, 1030) + job(102, 1, 1000, 1040)
+  events += job(101, 0, 1100, 1150)
+  events += job(101, 0, 1200, 1320) # 20 past its deadline
+  events.append((1400, "complete_taskset"))
+  for time, method, *args in sorted(events, key=lambda e : e[0]):
+    tracker.set_time(time)
+    getattr(tracker, method)(*args)
+  return JobReport(tracker.completed_tasksets[0])
+
+def test_per_task_stats():
+  r = report()
+  assert r.jobs.tolist() == [ 3, 1 ]
+  assert r.missed.tolist() == [ 1, 0 ]
+  assert r.max_tardiness.tolist() == [ 20, 0 ]
+  assert r.total_tardiness.tolist() == [ 20, 0 ]
+  # response times 30, 50, 120 (linear interpolation) and 40
+  assert np.allclose(r.response_percentiles, [ [ 50, 106, 118.6 ], [ 40, 40, 40 ] ])
+  assert r.max_response.tolist() == [ 120, 40 ]
+  assert r.max_exec.tolist() == [ 120, 40 ]
+  assert r.exceeded_wcet.tolist() == [ 1, 0 ]
+
+def test_schedulability_bounds():
+  r = report()
+  assert r.m == 2
+  assert np.isclose(r.utilization, 60 / 100 + 50 / 200)
+  assert np.isclose(r.observed_utilization, 200 / 3 / 100 + 40 / 200)
+  assert np.isclose(r.gfb_bound, 2 - 1 * 0.6)
+  assert r.feasible and r.gfb_schedulable
+  assert r.miss_ratio == 0.25
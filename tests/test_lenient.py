@@ -0,0 +1,47 @@
+# lenient mode: a taskset whose end was lost is quarantined at the next taskset_init, which still starts its taskset
+
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from config import Config
+from task_model import TaskParams
+from task_tracker import TaskTracker
+
+PARAMS = TaskParams(100000, 100000, 20000)
+
+def track(events: list[tuple]) -> TaskTracker:
+  tracker = TaskTracker(Config(progress=False, lenient=True, outliers=0))
+  for time, method, *args in events:
+    tracker.set_time(time)
+    getattr(tracker, method)(*args)
+  return tracker
+
+# a taskset running one job of a task on cpu0, the thread being switched in before its task_init
+def taskset(start_time: int, tid: int, complete: bool = True, sleep_timer: int | None = None) -> list[tuple]:
+  events = [
+    (start_time, "switch", 0, 0, tid),
+    (start_time + 10, "new_taskset"),
+    (start_time + 10, "add_task", tid, PARAMS),
+    (start_time + 20, "release", tid),
+    (start_time + 30, "complete", tid),
+  ]
+  if sleep_timer is not None:
+    events.append((start_time + 40, "hrtimer_start", 0, sleep_timer, 0x01)) # sched_ext sleep_until
+  events.append((start_time + 50, "switch", 0, tid, 0))
+  if complete:
+    events.append((start_time + 100, "complete_taskset"))
+  return events
+
+def test_lost_kill_threads():
+  tracker = track(taskset(1000, 101, complete=False) + taskset(2000, 102) + taskset(3000, 103))
+  assert [ taskset.taskset_id for taskset in tracker.completed_tasksets ] == [ 1, 2 ]
+  assert [ taskset.init_time for taskset in tracker.completed_tasksets ] == [ 2010, 3010 ]
+  assert [ (quarantined.taskset_id, quarantined.resync_time) for quarantined in tracker.quarantined_tasksets ] == [ (0, 2010) ]
+
+def test_pending_sleep_timer():
+  tracker = track(taskset(1000, 101, sleep_timer=0xabc) + taskset(2000, 102) + taskset(3000, 103))
+  assert [ taskset.taskset_id for taskset in tracker.completed_tasksets ] == [ 0, 1, 2 ]
+  assert [ (quarantined.taskset_id, quarantined.resync_time) for quarantined in tracker.quarantined_tasksets ] == [ (None, 2010) ]
+  assert tracker.sleep_timers == {}
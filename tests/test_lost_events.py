@@ -0,0 +1,54 @@
+# lost events: only kernel losses make a cpu tolerate unmatched sfunc exits, and only in the taskset they happened in,
+# and the event rates sampled at the packets
+
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from config import Config
+from task_tracker import TaskTracker
+from data_quality import DataQuality
+
+def new_tracker() -> TaskTracker:
+  tracker = TaskTracker(Config(progress=False, outliers=0))
+  tracker.set_time(1000)
+  tracker.new_taskset()
+  tracker.sfunc_entry("pick_task_dl", 0)
+  return tracker
+
+def test_kernel_loss_tolerated_in_its_taskset():
+  tracker = new_tracker()
+  tracker.lose_events(0, 1, 0, 1000, 1001)
+  tracker.set_time(1010)
+  tracker.sfunc_exit("pick_task_dl", 0) # entered before the loss
+  tracker.complete_taskset()
+  assert tracker.completed_tasksets[0].quality.lost_events == 1
+
+  tracker.set_time(2000)
+  tracker.new_taskset()
+  with pytest.raises(Exception, match="stack mismatch"):
+    tracker.sfunc_exit("pick_task_dl", 0)
+
+def test_userspace_loss_keeps_cpu_state():
+  tracker = new_tracker()
+  tracker.lose_events(0, 1, 0, 1000, 1001, kernel=False)
+  assert [ sfunc.name for sfunc in tracker.get_cpu(0).sfunc_stack ] == [ "pick_task_dl" ]
+  with pytest.raises(Exception, match="stack mismatch"):
+    tracker.sfunc_exit("update_curr_dl", 0)
+
+def test_event_rates_from_packets():
+  quality = DataQuality(0, True)
+  for _ in range(3):
+    quality.record_event(0)
+  quality.record_packet(0, 5)
+  for _ in range(6):
+    quality.record_event(0)
+  quality.record_packet(0, 25)
+  quality.record_event(0)
+  quality.end_time = 30
+  # 3 events over [0, 5], 6 over [5, 25] and 1 over [25, 30]
+  assert quality.cpus[0].rates(quality.start_time, quality.end_time, 10).tolist() == [ 4.5, 3.0, 2.5 ]
+  assert quality.cpus[0].packets == 2
@@ -0,0 +1,43 @@
+# scheduler overhead timelines: interval union, binning into buckets and per-cpu overhead fractions
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from task_model import SFuncBlock, SFuncData, CSwitchBlock, CompletedTaskset
+from data_quality import DataQuality
+from overhead_timeline import OverheadTimeline, union_intervals, bin_intervals
+
+def array(values: list[int]) -> np.ndarray:
+  return np.array(values, dtype=np.int64)
+
+def test_union_intervals():
+  starts, ends = union_intervals(array([ 20, 0, 5, 12 ]), array([ 30, 10, 12, 14 ]))
+  # [0, 10] and [5, 12] overlap, [12, 14] touches the union
+  assert starts.tolist() == [ 0, 20 ]
+  assert ends.tolist() == [ 14, 30 ]
+  assert union_intervals(array([]), array([]))[0].tolist() == []
+
+def test_bin_intervals():
+  edges = array([ 0, 10, 20, 30 ])
+  assert bin_intervals(array([ 0, 20 ]), array([ 12, 30 ]), edges).tolist() == [ 10, 2, 10 ]
+  assert bin_intervals(array([ 5 ]), array([ 25 ]), edges).tolist() == [ 5, 10, 5 ]
+  assert bin_intervals(array([ 3, 14 ]), array([ 4, 16 ]), edges).tolist() == [ 1, 2, 0 ]
+  assert bin_intervals(array([]), array([]), edges).tolist() == [ 0, 0, 0 ]
+
+def test_overhead_fractions():
+  # cpu0: outermost pick_task_dl [0, 12] (its nested call is not counted twice), context switch [8, 15]
+  # cpu1: context switch [22, 25]
+  pick = SFuncBlock("pick_task_dl", 0, None, 0, 0, 12)
+  exec_data = { "sfunc:pick_task_dl": SFuncData("pick_task_dl", [ pick ]), "sfunc:update_curr_dl": SFuncData("update_curr_dl", [ SFuncBlock("update_curr_dl", 0, pick, 1, 2, 6) ]) }
+  cswitch_blocks = [ CSwitchBlock(0, 8, 15), CSwitchBlock(1, 22, 25) ]
+  taskset = CompletedTaskset(0, [], exec_data, cswitch_blocks, [], [], DataQuality(0, False), 0, 30)
+  timeline = OverheadTimeline(taskset, 10)
+  assert timeline.cpu_ids.tolist() == [ 0, 1 ]
+  assert np.allclose(timeline.sfunc, [ [ 1.0, 0.2, 0.0 ], [ 0.0, 0.0, 0.0 ] ])
+  assert np.allclose(timeline.cswitch, [ [ 0.2, 0.5, 0.0 ], [ 0.0, 0.0, 0.3 ] ])
+  assert np.allclose(timeline.total, [ [ 1.0, 0.5, 0.0 ], [ 0.0, 0.0, 0.3 ] ])
+  assert timeline.worst_windows(2) == [ (0, 0, 1.0), (0, 10, 0.5) ]
@@ -0,0 +1,111 @@
+# regression tests of the ready queue reconstruction, driving the tracker directly (no trace needed)
+
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from config import Config
+from task_model import TaskParams
+from task_tracker import TaskTracker
+from ready_queue import IDLE_WHILE_READY, PRIORITY_INVERSION, find_violations
+
+BLOCKED = 1 # sched_switch prev_state of a thread going to sleep
+
+def track(events: list[tuple]) -> TaskTracker:
+  tracker = TaskTracker(Config(progress=False, exec_blocks=True, outliers=0))
+  for time, method, *args in events:
+    tracker.set_time(time)
+    getattr(tracker, method)(*args)
+  return tracker
+
+def violations(events: list[tuple]) -> list[tuple[str, int, int, int]]:
+  tracker = track(events)
+  return [ (v.kind, v.start_time, v.end_time, v.cpu_id) for v in find_violations(tracker.completed_tasksets[0]) ]
+
+# the wakeup latency on an idle cpu is not a violation, and a job switched in before its (delayed) job_release tracepoint
+# runs from the switch in, not from job_release
+def test_switch_in_on_idle_cpu():
+  params = TaskParams(100000, 100000, 20000)
+  assert violations([
+    (900, "switch", 0, -1, 0),
+    (900, "switch", 1, -1, 0),
+    (1000, "new_taskset"),
+    (1000, "add_task", 101, params),
+    (1000, "add_task", 102, params),
+    (1005, "wakeup", 101),
+    (1010, "switch", 0, 0, 101),
+    (1050, "release", 101),
+    (1100, "switch", 1, 0, 102),
+    (1100, "release", 102),
+    (1150, "complete", 102),
+    (1160, "switch", 1, 102, 0, BLOCKED),
+    (1200, "complete", 101),
+    (1210, "switch", 0, 101, 0, BLOCKED),
+    (1300, "complete_taskset"),
+  ]) == []
+
+# a job waiting for a busy cpu while another cpu of the taskset is idle
+def test_idle_while_ready():
+  params = TaskParams(100000, 100000, 20000)
+  assert violations([
+    (900, "switch", 0, -1, 500),
+    (900, "switch", 1, -1, 0),
+    (1000, "new_taskset"),
+    (1000, "add_task", 101, params),
+    (1000, "add_task", 102, params),
+    (1005, "wakeup", 101),
+    (1030, "switch", 0, 500, 101),
+    (1030, "release", 101),
+    (1100, "switch", 1, 0, 102),
+    (1100, "release", 102),
+    (1150, "complete", 102),
+    (1160, "switch", 1, 102, 0, BLOCKED),
+    (1200, "complete", 101),
+    (1210, "switch", 0, 101, 0, BLOCKED),
+    (1300, "complete_taskset"),
+  ]) == [ (IDLE_WHILE_READY, 1005, 1030, 1) ]
+
+# an earlier deadline job waiting for a busy cpu while another cpu runs a later deadline job
+def test_priority_inversion():
+  assert violations([
+    (900, "switch", 0, -1, 0),
+    (900, "switch", 1, -1, 500),
+    (1000, "new_taskset"),
+    (1000, "add_task", 101, TaskParams(50000, 50000, 20000)),
+    (1000, "add_task", 102, TaskParams(100000, 100000, 20000)),
+    (1000, "switch", 0, 0, 102),
+    (1000, "release", 102), # deadline 101000
+    (1005, "wakeup", 101),
+    (1030, "switch", 1, 500, 101),
+    (1030, "release", 101), # deadline 51030
+    (1100, "complete", 101),
+    (1110, "switch", 1, 101, 500, BLOCKED),
+    (1200, "complete", 102),
+    (1210, "switch", 0, 102, 0, BLOCKED),
+    (1300, "complete_taskset"),
+  ]) == [ (PRIORITY_INVERSION, 1005, 1030, 0) ]
+
+# a blocked job is not waiting, and the thread of a completed job running until it sleeps is not running the job
+def test_blocked_and_completed_tail():
+  tracker = track([
+    (900, "switch", 0, -1, 0),
+    (1000, "new_taskset"),
+    (1000, "add_task", 101, TaskParams(50000, 50000, 20000)),
+    (1000, "add_task", 102, TaskParams(100000, 100000, 20000)),
+    (1000, "switch", 0, 0, 102),
+    (1000, "release", 102), # deadline 101000
+    (1100, "complete", 102), # its thread runs until 1200
+    (1150, "wakeup", 101),
+    (1200, "switch", 0, 102, 101, BLOCKED),
+    (1200, "release", 101), # deadline 51200
+    (1300, "switch", 0, 101, 0, BLOCKED), # blocks with cpu0 idle
+    (1400, "wakeup", 101),
+    (1410, "switch", 0, 0, 101),
+    (1500, "complete", 101),
+    (1510, "switch", 0, 101, 0, BLOCKED),
+    (1600, "complete_taskset"),
+  ])
+  taskset = tracker.completed_tasksets[0]
+  assert [ job.runnable_intervals for job in taskset.jobs if job.task_id == 0 ] == [ [ (1150, 1200, 0), (1400, 1410, 0) ] ]
+  assert find_violations(taskset) == []
@@ -0,0 +1,55 @@
+# scheduler class profiles: only the selected classes' functions are tracked, and a task's release timer is only matched
+# against the class it was switched in with
+
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from config import Config
+from task_model import TaskParams
+from task_tracker import TaskTracker
+from sched_profiles import HRTIMER_MODE_REL, sched_class_of_prio
+
+BLOCKED = 1 # sched_switch prev_state of a thread going to sleep
+
+def track(events: list[tuple], sched_classes: list[str] | None = None) -> TaskTracker:
+  tracker = TaskTracker(Config(progress=False, outliers=0, sched_classes=sched_classes))
+  for time, method, *args in events:
+    tracker.set_time(time)
+    getattr(tracker, method)(*args)
+  return tracker
+
+# a completed job of task 101 starting a relative hrtimer before going to sleep
+def sleep_events(next_prio: int | None) -> list[tuple]:
+  return [
+    (1000, "new_taskset"),
+    (1000, "add_task", 101, TaskParams(100000, 100000, 20000)),
+    (1010, "switch", 0, 0, 101, 0, next_prio),
+    (1010, "release", 101),
+    (1050, "complete", 101),
+    (1060, "hrtimer_start", 0, 0xabc, HRTIMER_MODE_REL),
+    (1070, "switch", 0, 101, 0, BLOCKED),
+  ]
+
+def test_sched_class_of_prio():
+  assert [ sched_class_of_prio(prio) for prio in [ -101, -100, -1, 0, 39, 40 ] ] == [ "sched_dl", "sched_rt", "sched_rt", "sched_ext", "sched_ext", None ]
+
+def test_release_timer_of_task_class():
+  # unknown class: any profile's sleep timer matches
+  assert list(track(sleep_events(None)).sleep_timers) == [ 0xabc ]
+  # a sched_ext thread's relative timer is its sleep_until, a deadline thread's is not its replenishment timer
+  assert list(track(sleep_events(20)).sleep_timers) == [ 0xabc ]
+  assert list(track(sleep_events(-101)).sleep_timers) == []
+  # the task's class is not tracked
+  assert list(track(sleep_events(20), [ "sched_dl" ]).sleep_timers) == []
+
+def test_untracked_class_functions():
+  tracker = track([
+    (1000, "sfunc_entry", "pick_task_dl", 0),
+    (1010, "sfunc_entry", "pick_task_rt", 0),
+    (1020, "sfunc_exit", "pick_task_rt", 0),
+    (1030, "sfunc_exit", "pick_task_dl", 0),
+  ], [ "sched_dl" ])
+  blocks = tracker.get_cpu(0).sfunc_blocks
+  assert [ (block.name, block.nesting, block.entry_time, block.exit_time) for block in blocks ] == [ ("pick_task_dl", 0, 1000, 1030) ]
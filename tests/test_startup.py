@@ -0,0 +1,40 @@
+# enforces the startup budget of bench/bench_startup.py: help, and info on the synthetic trace of tests/fixtures
+# set STARTUP_BENCH_TRACE to a small real trace to also check info with tasksets and a full parse (needs babeltrace)
+
+import os
+import subprocess
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bench"))
+
+from bench_startup import DEFAULT_BUDGET, FIXTURE_TRACE, PARSE_PY, startup_times
+
+def test_startup_budget():
+  times = startup_times(os.environ.get("STARTUP_BENCH_TRACE"), 3)
+  over_budget = [ (name, duration) for name, duration in times if duration > DEFAULT_BUDGET ]
+  assert over_budget == []
+
+# the fixture is read from its metadata and indexes alone, without loading babeltrace or numpy
+def test_info_fixture_imports(tmp_path):
+  process = subprocess.run([ sys.executable, "-X", "importtime", PARSE_PY, "info", FIXTURE_TRACE, "-o", str(tmp_path) ], capture_output=True, text=True, check=True)
+  assert "cpu0: 8.0 KiB in 2 packets" in process.stdout
+  imported = [ line.split("|")[-1].strip() for line in process.stderr.splitlines() ]
+  assert [ module for module in imported if module.split(".")[0] in ("numpy", "bt2") ] == []
+
+# without analyses, writing the outputs of parse loads none of the analysis modules (nor numpy)
+def test_no_analyses_imports(tmp_path):
+  code = "\n".join([
+    "import sys",
+    "from config import Config",
+    "from task_tracker import TaskTracker",
+    "from output_writer import write_output",
+    f"config = Config(output_path={str(tmp_path)!r}, progress=False, analyses=[])",
+    "tracker = TaskTracker(config)",
+    "tracker.new_taskset()",
+    "tracker.complete_taskset()",
+    "write_output(tracker.completed_tasksets, tracker.quarantined_tasksets, config)",
+    "print(sorted(module for module in sys.modules if module.split('.')[0] in ('numpy', 'call_tree', 'job_report', 'ready_queue')))",
+  ])
+  process = subprocess.run([ sys.executable, "-c", code ], cwd=os.path.join(os.path.dirname(PARSE_PY), "src"), capture_output=True, text=True, check=True)
+  assert process.stdout.strip() == "[]"
+  assert sorted(os.listdir(tmp_path)) == [ "combined_data_quality.txt", "combined_taskset_stats.txt", "taskset_0_data_quality.txt", "taskset_0_stats.txt" ]
@@ -0,0 +1,41 @@
+# trace archives: only CTF files are extracted, placeholders replace the data streams, and the scratch limit covers the
+# full uncompressed trace
+
+import os
+import sys
+import tarfile
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from trace_archive import extract_trace_archive
+
+def archive(tmp_path, suffix: str, mode: str) -> str:
+  trace = tmp_path / "trace" / "kernel"
+  (trace / "index").mkdir(parents=True)
+  (trace / "metadata").write_text("/* CTF 1.8 */")
+  (trace / "index" / "channel0_0.idx").write_bytes(b"\0" * 16)
+  (trace / "channel0_0").write_bytes(b"\1" * 4096)
+  (trace / "notes.txt").write_text("not a CTF file")
+  path = str(tmp_path / f"trace{suffix}")
+  with tarfile.open(path, mode) as file:
+    file.add(str(tmp_path / "trace"), "trace")
+  return path
+
+@pytest.mark.parametrize("suffix, mode", [ (".tar", "w"), (".tar.gz", "w:gz") ])
+def test_placeholders(tmp_path, suffix, mode):
+  dest = tmp_path / "dest"
+  extract_trace_archive(archive(tmp_path, suffix, mode), str(dest), placeholders=True)
+  kernel = dest / "trace" / "kernel"
+  assert (kernel / "metadata").read_text() == "/* CTF 1.8 */"
+  assert (kernel / "index" / "channel0_0.idx").read_bytes() == b"\0" * 16
+  assert (kernel / "channel0_0").read_bytes() == b"\0" * 4096 # same size, but not extracted
+  assert not (kernel / "notes.txt").exists()
+
+def test_scratch_limit(tmp_path):
+  path = archive(tmp_path, ".tar", "w")
+  with pytest.raises(Exception, match="full uncompressed size"):
+    extract_trace_archive(path, str(tmp_path / "dest"), scratch_limit=1024)
+  extract_trace_archive(path, str(tmp_path / "dest2"), scratch_limit=8192)
+  assert (tmp_path / "dest2" / "trace" / "kernel" / "channel0_0").read_bytes() == b"\1" * 4096